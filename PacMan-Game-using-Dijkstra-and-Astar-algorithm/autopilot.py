@@ -0,0 +1,258 @@
+from collections import deque
+from dstar_lite import DStarLite
+from search import workspace
+
+TOUR_PELLETS = 16  # Plan a whole tour once this few pellets are left
+TWO_OPT_ROUNDS = 8
+
+def bfs_path(grid, start, goals, stats=None):
+    # One BFS from start that stops at the first tile in goals and returns
+    # the flat indices of the path to it, start excluded, or None. With the
+    # grid's pellet index as goals this finds the nearest pellet and its path
+    # in a single pass, and only touches the tiles it actually explores.
+    neighbours = grid.neighbours
+    ws = workspace(grid)
+    stamp = ws.begin()
+    seen, prev = ws.dist, ws.prev  # A tile is seen once its dist is stamp
+    seen[start] = stamp
+    queue = deque([start])
+    expanded, pushes = 0, 1
+    found = None
+    while queue:
+        i = queue.popleft()
+        expanded += 1
+        if i in goals:
+            found = i
+            break
+        for n in neighbours[i]:
+            if seen[n] != stamp:
+                seen[n] = stamp
+                prev[n] = i
+                pushes += 1
+                queue.append(n)
+    if stats is not None:
+        stats["expanded"] += expanded
+        stats["pushes"] += pushes
+    if found is None or found == start:
+        return None
+    path = []
+    while found != start:
+        path.append(found)
+        found = prev[found]
+    path.reverse()
+    return path
+
+def safe_bfs_path(grid, start, goals, field, step_ticks, stats=None):
+    # bfs_path that only walks onto tiles Pac-Man, taking step_ticks per
+    # move, reaches before any chasing ghost (see distance_field.DangerField).
+    # With no goal in reach, the path leads to the tile reached farthest from
+    # the ghosts instead, so it doesn't end on a goal; None if Pac-Man can't
+    # safely move at all.
+    neighbours, dist, far = grid.neighbours, field.dist, grid.size
+    prev = {start: -1}
+    depth = {start: 0}
+    queue = deque([start])
+    expanded = 0
+    found = refuge = None
+    refuge_dist = -1
+    while queue:
+        i = queue.popleft()
+        expanded += 1
+        if i in goals and i != start:
+            found = i
+            break
+        if i != start and (dist[i] if dist[i] >= 0 else far) > refuge_dist:
+            refuge, refuge_dist = i, dist[i] if dist[i] >= 0 else far
+        ticks = (depth[i] + 1) * step_ticks
+        for n in neighbours[i]:
+            if n not in prev and field.safe(n, ticks):
+                prev[n] = i
+                depth[n] = depth[i] + 1
+                queue.append(n)
+    if stats is not None:
+        stats["expanded"] += expanded
+        stats["pushes"] += len(prev)
+    if found is None:
+        found = refuge
+    if found is None:
+        return None
+    path = []
+    while found != start:
+        path.append(found)
+        found = prev[found]
+    path.reverse()
+    return path
+
+def _distances(grid, start, targets, stats=None):
+    # BFS from start that stops once every target is reached; returns
+    # {target: steps} for the reachable ones
+    neighbours = grid.neighbours
+    dist = {start: 0}
+    found = {start: 0} if start in targets else {}
+    queue = deque([start])
+    while queue and len(found) < len(targets):
+        i = queue.popleft()
+        d = dist[i] + 1
+        for n in neighbours[i]:
+            if n not in dist:
+                dist[n] = d
+                queue.append(n)
+                if n in targets:
+                    found[n] = d
+    if stats is not None:
+        stats["expanded"] += len(dist) - len(queue)
+        stats["pushes"] += len(dist)
+    return found
+
+def plan_tour(grid, start, stats=None):
+    # Orders the remaining pellets into a short open tour from start: greedy
+    # nearest neighbour on true maze distances, then 2-opt moves until no
+    # segment reversal helps. Returns the pellet indices in visiting order.
+    pellets = set(grid.pellet_cells)
+    dist = {start: _distances(grid, start, pellets, stats)}
+    pellets = [p for p in pellets if p in dist[start]]  # Drop unreachable ones
+    for p in pellets:
+        dist[p] = _distances(grid, p, pellets, stats)
+    tour, left, here = [], set(pellets), start
+    while left:
+        here = min(left, key=lambda p: (dist[here].get(p, float('inf')), p))
+        tour.append(here)
+        left.discard(here)
+
+    def d(a, b):
+        return dist[a].get(b, float('inf')) if b is not None else 0
+
+    order = [start] + tour
+    for _ in range(TWO_OPT_ROUNDS):
+        improved = False
+        for i in range(1, len(order) - 1):
+            for j in range(i + 1, len(order)):
+                after = order[j + 1] if j + 1 < len(order) else None
+                before = d(order[i - 1], order[i]) + d(order[j], after)
+                if d(order[i - 1], order[j]) + d(order[i], after) < before:
+                    order[i:j + 1] = order[i:j + 1][::-1]
+                    improved = True
+        if not improved:
+            break
+    return order[1:]
+
+class AutoPilot:
+    # Plans Pac-Man's route for Auto-Pilot mode. Normally the route leads to
+    # the nearest pellet, found together with its path in a single BFS. With
+    # tour=True, once few pellets are left the route visits all of them in
+    # one planned tour, which is kept until a pellet on it is eaten out of
+    # order; late in a level that replaces a near-full-grid search per
+    # pellet with a handful of bounded ones per tour. With incremental=True,
+    # a route to a single pellet is repaired by D* Lite when doors open or
+    # close instead of being thrown away.
+    #
+    # When GameState hands it a DangerField (danger_field=True), it also
+    # minds the ghosts: a frightened ghost it can catch in time is chased,
+    # routes only use tiles Pac-Man gets to before any chasing ghost, a route
+    # a ghost cuts off is dropped, and with no safe route at all Pac-Man
+    # backs away from the nearest ghost. Tours are not planned then, being
+    # too long to stay safe.
+    def __init__(self, grid, tour=False, incremental=False, step_ticks=1):
+        self.grid = grid
+        self.tour = tour
+        self.incremental = incremental
+        self.step_ticks = step_ticks  # Ticks per Pac-Man move
+        self.danger = None  # DangerField for this tick when minding ghosts
+        self.planner = None  # D* Lite search, built on the first door change
+        self.route = deque()  # Flat indices still to walk, next tile first
+        self.targets = deque()  # Pellets the route was planned to eat, in order
+
+    def reset(self):
+        self.route.clear()
+        self.targets.clear()
+
+    def target(self):
+        return self.grid.xy(self.targets[0]) if self.targets else None
+
+    def path(self):
+        return [self.grid.xy(i) for i in self.route]
+
+    def _valid(self, here):
+        pellets = self.grid.pellet_cells
+        if self.targets and self.targets[0] not in pellets:
+            self.targets.popleft()  # Eaten on arrival, as planned
+        if not self.route or not self.targets:
+            return False
+        if self.route[0] not in self.grid.neighbours[here]:
+            return False  # Pac-Man was moved (lost a life, player steered)
+        if not all(t in pellets for t in self.targets):
+            return False
+        if self.danger is not None:
+            step_ticks, safe = self.step_ticks, self.danger.safe
+            return all(safe(i, k * step_ticks) for k, i in enumerate(self.route, 1))
+        return True
+
+    def next_tile(self, x, y):
+        # Next (x, y) on the planned route for Pac-Man at (x, y), or None when
+        # the route is used up or stale and plan() has to be called
+        here = self.grid.index(x, y)
+        if self.route and self.route[0] == here:
+            self.route.popleft()  # Reached the tile we were heading for
+        if self.danger is not None:
+            prey = self.danger.chase(here, self.step_ticks)
+            if prey is not None:
+                self.reset()
+                return self.grid.xy(prey)
+        if not self._valid(here):
+            return None
+        return self.grid.xy(self.route[0])
+
+    def plan(self, x, y, stats=None):
+        # Replans from (x, y) and returns the first step, or None when no
+        # pellet can be reached
+        grid = self.grid
+        here = grid.index(x, y)
+        self.reset()
+        if self.danger is not None:
+            path = safe_bfs_path(grid, here, grid.pellet_cells, self.danger, self.step_ticks, stats)
+            if path is None:
+                away = self.danger.flee(here)
+                return grid.xy(away) if away is not None else None
+            if path[-1] not in grid.pellet_cells:
+                return grid.xy(path[0])  # Heading for safety; replanned next tick
+            self.follow(path)
+        elif self.tour and grid.pellets <= TOUR_PELLETS:
+            self._plan_tour(here, stats)
+        else:
+            self.follow(bfs_path(grid, here, grid.pellet_cells, stats))
+        return grid.xy(self.route[0]) if self.route else None
+
+    def follow(self, path):
+        # Takes a route to a pellet planned elsewhere (bfs_path's indices);
+        # next_tile() drops it if it no longer fits
+        self.reset()
+        if path:
+            self.route.extend(path)
+            self.targets.append(path[-1])
+
+    def cells_changed(self, cells, x, y, stats=None):
+        # Tiles (flat indices) flipped between open and blocked while Pac-Man
+        # is at (x, y): repair the route to the current pellet, or drop it
+        # so the next tick replans
+        grid = self.grid
+        if self.planner is not None:
+            self.planner.cells_changed(cells)
+        if self.incremental and len(self.targets) == 1 and grid.is_walkable(x, y):
+            target = grid.xy(self.targets[0])
+            if self.planner is None:
+                self.planner = DStarLite(grid, (x, y), target)
+            path = self.planner.path((x, y), target, stats)
+            if len(path) > 1:
+                self.route = deque(grid.index(*tile) for tile in path[1:])
+                return
+        self.reset()
+
+    def _plan_tour(self, here, stats):
+        at = here
+        for pellet in plan_tour(self.grid, here, stats):
+            leg = bfs_path(self.grid, at, (pellet,), stats)
+            if leg is None:
+                break
+            self.route.extend(leg)
+            self.targets.append(pellet)
+            at = pellet
@@ -0,0 +1,313 @@
+import argparse
+import time
+import numpy as np
+from grid import EMPTY, OBSTACLE, WALL
+from game import CLASSIC, DOOR_PERIOD, FPS, as_level
+
+# N games advanced together as stacked NumPy arrays. The rules are the ones in
+# GameState.step (dot=10, power pellet=50 with FPS * 7 frightened ticks,
+# fruit=100, ghost=200, move delays 6 and 8, doors toggling every
+# door_period ticks); ghosts follow a distance field from Pac-Man exactly
+# like GameState with distance_field=True. The games share their walls, so
+# the fields come from one all-pairs distance table per door state, and both
+# the ghosts and the Auto-Pilot look distances up instead of searching.
+# Python only loops over the four ghosts, never over games.
+
+DIRECTIONS = np.array([(1,0), (-1,0), (0,1), (0,-1)], dtype=np.int16)  # (dx, dy)
+NO_ACTION = -1
+# DIRECTIONS columns indexed by a direction or NO_ACTION, which moves nowhere
+MOVE_X = np.append(DIRECTIONS[:, 0], 0).astype(np.int16)
+MOVE_Y = np.append(DIRECTIONS[:, 1], 0).astype(np.int16)
+PACMAN_DELAY = 6
+GHOST_DELAY = 8
+FAR = np.iinfo(np.int16).max  # Distance of walls and unreachable tiles
+MAX_TABLE_BYTES = 1 << 28  # Largest distance table built for one wall layout
+BUILD_CHUNK_BYTES = 1 << 24  # ... of which one BFS batch may use at a time
+
+def distance_fields(walkable, sources):
+    # Batched multi-source BFS. walkable is a padded (ROWS+2, COLS+2) mask with
+    # a False border, sources a (N, ROWS+2, COLS+2) mask. Returns int16 step
+    # counts to the nearest source, FAR for walls and unreachable tiles.
+    frontier = sources & walkable
+    dist = np.where(frontier, 0, FAR).astype(np.int16)
+    d = 0
+    while frontier.any():
+        d += 1
+        grown = np.zeros_like(frontier)
+        grown[:, :, 1:] |= frontier[:, :, :-1]
+        grown[:, :, :-1] |= frontier[:, :, 1:]
+        grown[:, 1:, :] |= frontier[:, :-1, :]
+        grown[:, :-1, :] |= frontier[:, 1:, :]
+        frontier = grown & walkable & (dist == FAR)
+        dist[frontier] = d
+    return dist
+
+def distance_table(walkable, cells):
+    # All-pairs distances for one wall layout, like the next-hop table:
+    # table[a, b] is the distance between the tiles cells[a] and cells[b]
+    # (padded flat indices of every tile that is ever walkable). Row and
+    # column len(cells) stand for any wall and are all FAR, as are the rows
+    # and columns of closed doors.
+    n, size = len(cells), walkable.size
+    table = np.full((n + 1, n + 1), FAR, dtype=np.int16)
+    chunk = max(1, BUILD_CHUNK_BYTES // (size * 4))
+    for first in range(0, n, chunk):
+        batch = cells[first:first + chunk]
+        sources = np.zeros((len(batch), size), dtype=bool)
+        sources[np.arange(len(batch)), batch] = True
+        fields = distance_fields(walkable, sources.reshape((len(batch),) + walkable.shape))
+        table[first:first + len(batch), :n] = fields.reshape(len(batch), size)[:, cells]
+    return table
+
+def downhill(around, here):
+    # Index into DIRECTIONS of the smallest of each row of around (distances
+    # from the four neighbours, in DIRECTIONS order) where it is below here,
+    # else NO_ACTION. Ties go to the first, as in the scalar field's scan;
+    # a tile off the field (FAR) makes any reachable neighbour the way out.
+    best = around.argmin(axis=1)
+    found = around[np.arange(len(best)), best] < here
+    return np.where(found, best, NO_ACTION).astype(np.int16)
+
+class BatchSimulator:
+    def __init__(self, n, maze=CLASSIC, auto_pilot=False):
+        # maze is a Level, or a maze played with the classic spawns
+        self.level = level = as_level(maze)
+        grid = level.grid
+        base = np.frombuffer(bytes(grid.cells), dtype=np.uint8).reshape(grid.rows, grid.cols)
+        self.n = n
+        self.rows, self.cols = base.shape
+        self.mazes = np.repeat(base[None], n, axis=0)  # (N, ROWS, COLS)
+        # Games all start together, so their doors open and close together
+        # and one padded mask serves every game
+        self.walkable = np.zeros((self.rows + 2, self.cols + 2), dtype=bool)
+        self.walkable[1:-1, 1:-1] = (base != WALL) & (base != OBSTACLE)
+        self.door_y, self.door_x = np.nonzero(base == OBSTACLE)
+        self.door_period = level.door_period or DOOR_PERIOD
+        self.tick = 0  # Ticks stepped, the same for every running game
+        # Tiles are addressed by padded flat index, and in the distance
+        # tables by id: doors keep theirs whether open or closed, and every
+        # wall shares the last one
+        self.width = self.cols + 2
+        self._free = self.walkable.reshape(-1)  # View that follows the doors
+        self.offsets = DIRECTIONS[:, 0].astype(np.int32) + DIRECTIONS[:, 1].astype(np.int32) * self.width
+        self._around = np.concatenate(([0], self.offsets))  # A tile, then its neighbours
+        cells = np.sort(np.concatenate((np.flatnonzero(self.walkable), self._tile(self.door_x, self.door_y))))
+        if (len(cells) + 1) ** 2 * 2 > MAX_TABLE_BYTES:
+            raise ValueError("maze has too many walkable tiles for a batch distance table")
+        self.cells = cells
+        self.ids = np.full(self.walkable.size, len(cells), dtype=np.int32)
+        self.ids[cells] = np.arange(len(cells))
+        self._tables = {}  # walkable.tobytes() -> distance_table(), one per door state
+        self._table = self._layout()
+        g = len(level.ghost_starts)
+        self.pac_x = np.full(n, level.pacman_start[0], dtype=np.int16)
+        self.pac_y = np.full(n, level.pacman_start[1], dtype=np.int16)
+        self.pac_dir = np.full(n, NO_ACTION, dtype=np.int16)  # Index into DIRECTIONS
+        self.pac_next = np.full(n, NO_ACTION, dtype=np.int16)
+        self.pac_counter = np.zeros(n, dtype=np.int16)
+        self.ghost_x = np.tile(np.array([s[0] for s in level.ghost_starts], dtype=np.int16), (n, 1))
+        self.ghost_y = np.tile(np.array([s[1] for s in level.ghost_starts], dtype=np.int16), (n, 1))
+        self.ghost_dir = np.full((n, g), NO_ACTION, dtype=np.int16)
+        self.ghost_counter = np.zeros((n, g), dtype=np.int16)
+        self.frightened_timer = np.zeros((n, g), dtype=np.int16)  # frightened while > 0
+        self.respawn_timer = np.zeros((n, g), dtype=np.int16)
+        self.score = np.zeros(n, dtype=np.int32)
+        self.lives = np.full(n, 3, dtype=np.int8)
+        self.pellets = ((base == 0) | (base == 3)).sum() * np.ones(n, dtype=np.int32)
+        # Per game and tile id, 0 on a pellet and FAR elsewhere, so the
+        # Auto-Pilot can mask table rows with np.maximum; eating a pellet
+        # sets its tile to FAR
+        ys, xs = np.nonzero((base == 0) | (base == 3))
+        pellets = np.full(len(cells) + 1, FAR, dtype=np.int16)
+        pellets[self.ids[self._tile(xs, ys)]] = 0
+        self.pellet_far = np.repeat(pellets[None], n, axis=0)
+        self.auto_pilot = np.full(n, auto_pilot, dtype=bool)
+        self.running = np.ones(n, dtype=bool)
+        self.won = np.zeros(n, dtype=bool)
+        self.ticks = np.zeros(n, dtype=np.int32)
+        # Pac-Man only eats on a tile he has just been put on
+        self._arrived = np.ones(n, dtype=bool)
+
+    def _tile(self, x, y):
+        # Padded flat index of unpadded tile coordinates
+        return (y.astype(np.int32) + 1) * self.width + x + 1
+
+    def _layout(self):
+        # The distance table for the doors as they are now, built on first use
+        key = self.walkable.tobytes()
+        if key not in self._tables:
+            self._tables[key] = distance_table(self.walkable, self.cells)
+        return self._tables[key]
+
+    def _pellet_step(self, games):
+        # Auto-Pilot: head for the nearest pellet left. Each candidate tile's
+        # distance to it is the smallest entry of the tile's table row once
+        # the tiles without a pellet are raised to FAR, with no search.
+        # Most moves are along a line of pellets: a pellet next door is the
+        # nearest there is, and the first one in DIRECTIONS order wins
+        tiles = self.ids[self._tile(self.pac_x[games], self.pac_y[games])[:, None] + self._around]
+        far = self.pellet_far[games[:, None], tiles]
+        step = downhill(far[:, 1:], far[:, 0])
+        rest = (step < 0) | (far[:, 0] == 0)
+        if rest.any():
+            rows = self._table[tiles[rest]]
+            np.maximum(rows, self.pellet_far[games[rest]][:, None, :], out=rows)
+            nearest = rows.min(axis=2)
+            step[rest] = downhill(nearest[:, 1:], nearest[:, 0])
+        return step
+
+    def _ghost_step(self, games, g):
+        # Distance field mode: the first neighbour one step closer to Pac-Man,
+        # read from Pac-Man's row of the table
+        rows = self.ids[self._tile(self.pac_x[games], self.pac_y[games])]
+        here = self._tile(self.ghost_x[games, g], self.ghost_y[games, g])
+        around = self._table[rows[:, None], self.ids[here[:, None] + self.offsets]]
+        return downhill(around, self._table[rows, self.ids[here]])
+
+    def step(self, actions=None):
+        # Advances every running game by one tick. actions is an (N,) array of
+        # DIRECTIONS indices (NO_ACTION to keep going); a player action turns
+        # Auto-Pilot off for that game, as in GameState.step.
+        live = self.running.copy()
+        if not live.any():
+            return
+        self.ticks += live
+        self.tick += 1
+        if len(self.door_x) and self.tick % self.door_period == 0:
+            self._toggle_doors(live)
+        if actions is not None:
+            actions = np.asarray(actions)
+            acted = live & (actions >= 0)
+            np.copyto(self.pac_next, actions, where=acted, casting="unsafe")
+            self.auto_pilot &= ~acted
+        self._move_pacman(live)
+        self._eat(live)
+        self._move_ghosts(live)
+        won = self.running & (self.pellets == 0)
+        self.won |= won
+        self.running &= ~won
+
+    def _toggle_doors(self, live):
+        # As GameState._toggle_doors: every door flips between open and closed
+        ys, xs = self.door_y, self.door_x
+        opening = not self.walkable[ys[0] + 1, xs[0] + 1]
+        self.walkable[ys + 1, xs + 1] = opening
+        self.mazes[np.flatnonzero(live)[:, None], ys, xs] = EMPTY if opening else OBSTACLE
+        self._table = self._layout()
+
+    def _move_pacman(self, live):
+        # Auto-Pilot only needs a direction on the ticks where Pac-Man moves
+        planning = live & self.auto_pilot & (self.pac_counter + 1 >= PACMAN_DELAY) & (self.pellets > 0)
+        if planning.any():
+            games = np.flatnonzero(planning)
+            self.pac_next[games] = self._pellet_step(games)
+        nx, ny = self.pac_x + MOVE_X[self.pac_next], self.pac_y + MOVE_Y[self.pac_next]
+        turn = live & (self.pac_next >= 0) & self._free[self._tile(nx, ny)]
+        np.copyto(self.pac_dir, self.pac_next, where=turn)
+        self._arrived |= self._move_with_delay(live, self.pac_x, self.pac_y, self.pac_dir, self.pac_counter, PACMAN_DELAY)
+
+    def _move_with_delay(self, mask, xs, ys, dirs, counter, delay):
+        # In-place counterpart of Entity.move_with_delay; returns who moved
+        counter += mask
+        due = mask & (counter >= delay)
+        np.copyto(counter, 0, where=due)
+        nx, ny = xs + MOVE_X[dirs], ys + MOVE_Y[dirs]
+        moved = due & (dirs >= 0) & self._free[self._tile(nx, ny)]
+        np.copyto(xs, nx, where=moved)
+        np.copyto(ys, ny, where=moved)
+        return moved
+
+    def _eat(self, live):
+        # Tiles only change when eaten, so only games whose Pac-Man has
+        # arrived somewhere since the last tick can eat anything
+        games = np.flatnonzero(self._arrived & live)
+        self._arrived[:] = False
+        x, y = self.pac_x[games], self.pac_y[games]
+        tile = self.mazes[games, y, x]
+        edible = (tile == 0) | (tile == 3) | (tile == 4)
+        self.score[games] += np.select([tile == 0, tile == 3, tile == 4], [10, 50, 100], 0).astype(np.int32)
+        self.pellets[games] -= ((tile == 0) | (tile == 3)).astype(np.int32)
+        self.frightened_timer[games[tile == 3]] = FPS * 7  # 7 seconds
+        self.mazes[games[edible], y[edible], x[edible]] = 2
+        self.pellet_far[games, self.ids[self._tile(x, y)]] = FAR
+
+    def _move_ghosts(self, live):
+        active = live.copy()  # Games still processing ghosts this tick
+        for g in range(self.ghost_x.shape[1]):
+            # Column views, so every update is written straight into the arrays
+            xs, ys = self.ghost_x[:, g], self.ghost_y[:, g]
+            respawn, frightened_timer = self.respawn_timer[:, g], self.frightened_timer[:, g]
+            respawning = active & (respawn > 0)
+            respawn -= respawning
+            moving = active & ~respawning
+            frightened = moving & (frightened_timer > 0)
+            frightened_timer -= frightened
+            # Like GameState, steer only on the tick the ghost will move
+            chasing = moving & ~frightened & (self.ghost_counter[:, g] + 1 >= GHOST_DELAY)
+            if chasing.any():
+                games = np.flatnonzero(chasing)
+                step = self._ghost_step(games, g)
+                dirs = self.ghost_dir[games, g]
+                self.ghost_dir[games, g] = np.where(step >= 0, step, dirs)
+            self._move_with_delay(moving, xs, ys, self.ghost_dir[:, g], self.ghost_counter[:, g], GHOST_DELAY)
+            # Check collision
+            hit = moving & (xs == self.pac_x) & (ys == self.pac_y)
+            if not hit.any():
+                continue
+            eaten = hit & (frightened_timer > 0)
+            self.score[eaten] += 200
+            self.ghost_x[eaten, g], self.ghost_y[eaten, g] = self.level.ghost_house
+            frightened_timer[eaten] = 0
+            respawn[eaten] = FPS * 2
+            caught = hit & ~eaten
+            if caught.any():
+                self.lives[caught] -= 1
+                self.running &= ~(caught & (self.lives == 0))
+                reset = caught & (self.lives > 0)
+                self.pac_x[reset], self.pac_y[reset] = self.level.pacman_start
+                self.pac_dir[reset] = NO_ACTION
+                self.ghost_x[reset] = [s[0] for s in self.level.ghost_starts]
+                self.ghost_y[reset] = [s[1] for s in self.level.ghost_starts]
+                self.ghost_dir[reset] = NO_ACTION
+                self._arrived |= reset
+                active &= ~caught  # Like the break in GameState: skip the rest
+
+OPENING_TICKS = FPS * 5  # Auto-Pilot runs take over within this many ticks
+TURN_CHANCE = 0.05  # Per tick, chance of a random player input
+
+def random_actions(rng, n):
+    # One random DIRECTIONS index for about TURN_CHANCE of the games, else NO_ACTION
+    return np.where(rng.random(n) < TURN_CHANCE, rng.integers(0, len(DIRECTIONS), n), NO_ACTION)
+
+def main(argv=None):
+    # Throughput check on varied games: every game gets its own random player
+    # inputs, and with Auto-Pilot these only open the game, for a random
+    # number of ticks, before it takes over
+    parser = argparse.ArgumentParser(description="Batch simulator throughput check")
+    parser.add_argument("games", type=int, nargs="?", default=1000)
+    parser.add_argument("ticks", type=int, nargs="?", default=1000)
+    parser.add_argument("--manual", action="store_true", help="random inputs throughout, no Auto-Pilot")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    n = args.games
+    rng = np.random.default_rng(args.seed)
+    handover = np.full(n, -1) if args.manual else rng.integers(0, OPENING_TICKS, n)
+    sim = BatchSimulator(n)
+    start = time.perf_counter()
+    for _ in range(args.ticks):
+        actions = random_actions(rng, n)
+        if not args.manual:
+            actions[sim.ticks >= handover] = NO_ACTION
+            sim.auto_pilot |= sim.ticks == handover
+        sim.step(actions)
+        if not sim.running.any():
+            break
+    elapsed = time.perf_counter() - start
+    total = int(sim.ticks.sum())
+    print(f"{n} games, {total} game ticks in {elapsed:.2f}s ({total / elapsed:,.0f} ticks/s)")
+    print(f"won {int(sim.won.sum())}, lost {int((sim.lives == 0).sum())}, "
+          f"mean score {sim.score.mean():.1f} (min {sim.score.min()}, max {sim.score.max()})")
+
+if __name__ == "__main__":
+    main()
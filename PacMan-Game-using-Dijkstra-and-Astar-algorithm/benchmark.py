@@ -0,0 +1,222 @@
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from game import Entity, MAZE, get_path, get_full_path
+from dijkstra import dijkstra_next_direction
+from astar import astar_next_direction
+from jps import jps_next_direction
+from junction_graph import JunctionGraph
+from dstar_lite import DStarLite
+from grid import Grid
+
+# Times every pathfinding entry point on generated mazes from the real 17x18
+# level up to 1000x1000, both open-field and corridor-heavy, with fixed
+# seeds. Results can be saved as a baseline and later runs compared to it:
+#   python benchmark.py --save-baseline bench_baseline.json
+#   python benchmark.py --baseline bench_baseline.json   # exit code 1 on regression
+
+DEFAULT_SIZES = ["17x18", "64x64", "256x256", "1000x1000"]
+KINDS = ["open", "corridor"]
+OPEN_WALL_CHANCE = 0.12
+BRAID_CHANCE = 0.1  # Share of inner maze walls knocked out to create loops
+TIME_TOLERANCE = 0.25  # Allowed p50 slowdown before a timing regression is flagged
+TIME_SLACK_MS = 0.05  # ... on top of which tiny mazes get some absolute slack
+
+def generate_maze(rows, cols, kind, seed):
+    # 1 = wall, 0 = dot, with a solid border like MAZE
+    rng = random.Random(seed)
+    if kind == "open":
+        maze = [[1 if x in (0, cols - 1) or y in (0, rows - 1) or rng.random() < OPEN_WALL_CHANCE else 0
+                 for x in range(cols)] for y in range(rows)]
+        return maze
+    # Corridor maze: iterative depth-first carve over odd cells, then braid
+    maze = [[1] * cols for _ in range(rows)]
+    maze[1][1] = 0
+    stack = [(1, 1)]
+    while stack:
+        x, y = stack[-1]
+        options = [(dx, dy) for dx, dy in [(2,0), (-2,0), (0,2), (0,-2)]
+                   if 0 < x + dx < cols - 1 and 0 < y + dy < rows - 1 and maze[y + dy][x + dx] == 1]
+        if not options:
+            stack.pop()
+            continue
+        dx, dy = rng.choice(options)
+        maze[y + dy // 2][x + dx // 2] = 0
+        maze[y + dy][x + dx] = 0
+        stack.append((x + dx, y + dy))
+    for y in range(1, rows - 1):
+        for x in range(1, cols - 1):
+            if maze[y][x] == 1 and (x % 2) != (y % 2) and rng.random() < BRAID_CHANCE:
+                maze[y][x] = 0
+    return maze
+
+JUNCTION_GRAPHS = {}  # id(maze) -> its JunctionGraph, filled by load_mazes
+
+def load_mazes(sizes, kinds, junction_graphs=False):
+    # Mazes are converted to a Grid, and their junction graphs built if
+    # asked for, once, outside the timed queries
+    mazes = []
+    for size in sizes:
+        rows, cols = (int(v) for v in size.split("x"))
+        if (rows, cols) == (len(MAZE), len(MAZE[0])):
+            mazes.append(("classic", size, Grid.from_rows(MAZE)))
+        for i, kind in enumerate(kinds):
+            mazes.append((kind, size, Grid.from_rows(generate_maze(rows, cols, kind, seed=rows * 100003 + cols * 31 + i))))
+    if junction_graphs:
+        for kind, size, maze in mazes:
+            JUNCTION_GRAPHS[id(maze)] = JunctionGraph(maze)
+    return mazes
+
+def pick_queries(maze, count, seed):
+    rng = random.Random(seed)
+    cells = [(x, y) for y in range(maze.rows) for x in range(maze.cols) if maze.is_walkable(x, y)]
+    return [(rng.choice(cells), rng.choice(cells)) for _ in range(count)]
+
+# Each entry point takes (maze, start, goal, stats) and returns a path length
+# (or None when it only yields a direction), so results can be cross-checked.
+
+def _direction(fn):
+    def run(maze, start, goal, stats):
+        fn(Entity(*start, None), Entity(*goal, None), maze, stats=stats)
+        return None
+    return run
+
+def _get_path(algorithm):
+    def run(maze, start, goal, stats):
+        return len(get_path(start, goal, maze, algorithm, stats=stats))
+    return run
+
+def _get_full_path(algorithm):
+    def run(maze, start, goal, stats):
+        return len(get_full_path(Entity(*start, None), Entity(*goal, None), maze, algorithm, stats=stats) or [])
+    return run
+
+def _junction_path(algorithm):
+    # Queries the graph load_mazes built for this maze
+    def run(maze, start, goal, stats):
+        return len(JUNCTION_GRAPHS[id(maze)].path(start, goal, algorithm, stats))
+    return run
+
+def _dstar_lite_path(maze, start, goal, stats):
+    # A fresh D* Lite search per query: its first search, without any repair
+    return len(DStarLite(maze, start, goal).path(start, goal, stats))
+
+ENTRY_POINTS = {
+    "dijkstra_next_direction": _direction(dijkstra_next_direction),
+    "astar_next_direction": _direction(astar_next_direction),
+    "jps_next_direction": _direction(jps_next_direction),
+    "get_path/dijkstra": _get_path("dijkstra"),
+    "get_path/astar": _get_path("astar"),
+    "get_path/jps": _get_path("jps"),
+    "get_full_path/dijkstra": _get_full_path("dijkstra"),
+    "get_full_path/astar": _get_full_path("astar"),
+    "get_full_path/jps": _get_full_path("jps"),
+    "junction_graph/dijkstra": _junction_path("dijkstra"),
+    "junction_graph/astar": _junction_path("astar"),
+    "dstar_lite": _dstar_lite_path,
+}
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+def run_benchmarks(mazes, entries, queries, repeat):
+    results = {}
+    for kind, size, maze in mazes:
+        pairs = pick_queries(maze, queries, seed=maze.size)
+        lengths = {}
+        for name in entries:
+            fn = ENTRY_POINTS[name]
+            stats = {"expanded": 0, "pushes": 0}
+            times = []
+            for i, (start, goal) in enumerate(pairs):
+                # Best of several runs per query keeps scheduler noise out
+                best = None
+                for r in range(repeat):
+                    t0 = time.perf_counter()
+                    length = fn(maze, start, goal, stats if r == 0 else {"expanded": 0, "pushes": 0})
+                    elapsed = time.perf_counter() - t0
+                    best = elapsed if best is None else min(best, elapsed)
+                times.append(best)
+                if length is not None:
+                    lengths.setdefault(i, set()).add(length)
+            # Peak memory is measured on a separate run; tracemalloc skews timing
+            tracemalloc.start()
+            fn(maze, pairs[0][0], pairs[0][1], {"expanded": 0, "pushes": 0})
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results[f"{kind}/{size}/{name}"] = {
+                "p50_ms": percentile(times, 0.5) * 1000,
+                "p99_ms": percentile(times, 0.99) * 1000,
+                "mean_ms": sum(times) / len(times) * 1000,
+                "nodes_expanded": stats["expanded"] / len(pairs),
+                "heap_pushes": stats["pushes"] / len(pairs),
+                "peak_kib": peak / 1024,
+            }
+        # Every full-path entry point must agree on path lengths
+        mismatched = [i for i, found in lengths.items() if len(found) > 1]
+        if mismatched:
+            results[f"{kind}/{size}/path_length_mismatches"] = {"queries": mismatched}
+    return results
+
+def compare(results, baseline, tolerance):
+    # Search counters are deterministic, so any increase is a regression;
+    # latency gets some slack for machine noise
+    regressions = []
+    for key, now in results.items():
+        before = baseline.get(key)
+        if key.endswith("path_length_mismatches"):
+            regressions.append(f"{key}: {now['queries']}")
+            continue
+        if before is None:
+            continue
+        for metric in ("nodes_expanded", "heap_pushes"):
+            if now[metric] > before[metric]:
+                regressions.append(f"{key}: {metric} {before[metric]:.1f} -> {now[metric]:.1f}")
+        if now["p50_ms"] > before["p50_ms"] * (1 + tolerance) + TIME_SLACK_MS:
+            regressions.append(f"{key}: p50 {before['p50_ms']:.3f}ms -> {now['p50_ms']:.3f}ms")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pathfinding benchmark suite")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="ROWSxCOLS, e.g. 17x18 256x256")
+    parser.add_argument("--kinds", nargs="+", default=KINDS, choices=KINDS)
+    parser.add_argument("--entries", nargs="+", default=list(ENTRY_POINTS), choices=list(ENTRY_POINTS))
+    parser.add_argument("--queries", type=int, default=30, help="start/goal pairs per maze")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per query (best is kept)")
+    parser.add_argument("--baseline", help="compare against this baseline file")
+    parser.add_argument("--save-baseline", help="write the results as a new baseline file")
+    parser.add_argument("--tolerance", type=float, default=TIME_TOLERANCE)
+    parser.add_argument("--json", help="write the results as JSON")
+    args = parser.parse_args(argv)
+
+    junction_graphs = any(name.startswith("junction_graph/") for name in args.entries)
+    results = run_benchmarks(load_mazes(args.sizes, args.kinds, junction_graphs), args.entries, args.queries, args.repeat)
+    print(f"{'benchmark':60} {'p50 ms':>9} {'p99 ms':>9} {'expanded':>10} {'pushes':>10} {'peak KiB':>9}")
+    for key, r in results.items():
+        if "p50_ms" in r:
+            print(f"{key:60} {r['p50_ms']:9.3f} {r['p99_ms']:9.3f} {r['nodes_expanded']:10.1f} "
+                  f"{r['heap_pushes']:10.1f} {r['peak_kib']:9.1f}")
+        else:
+            print(f"{key:60} path lengths differ on queries {r['queries']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,110 @@
+import heapq
+from grid import as_grid
+from search import workspace
+
+# Bidirectional Dijkstra / A* for point-to-point full-path queries. One
+# search grows from the start, one backwards from the goal, and they stop
+# once no path through the two frontiers can beat the best meeting found so
+# far, which on a long path explores about half the area of a one-sided
+# search. Paths have the same length as get_path's, though between equally
+# short paths the two can pick different ones.
+#
+# For A* both sides use the average of the two Manhattan potentials
+# (Ikeda et al.), (h_goal(v) - h_start(v)) / 2 forwards and its negation
+# backwards, which keeps the reduced step costs non-negative so the usual
+# bidirectional Dijkstra stopping rule still holds. Keys are doubled to stay
+# integers; Dijkstra is the same search with zero potentials. The averaged
+# potential guides each side only half as well as one-sided A*'s, so on big
+# open levels this is slower than plain A*, and get_full_path only uses it
+# for Dijkstra.
+
+def bidirectional_path(start, goal, maze, algorithm="dijkstra", stats=None):
+    # Returns a list of (x, y) positions from start to goal (including both),
+    # or [] if there is no path
+    grid = as_grid(maze)
+    if start == goal:
+        return [start]
+    if not grid.is_walkable(*goal):
+        return []  # Nothing steps into a wall; get_path gives up the same way
+    cols, neighbours = grid.cols, grid.neighbours
+    s, t = grid.index(*start), grid.index(*goal)
+    sx, sy = start
+    tx, ty = goal
+    astar = algorithm == "astar"
+    # P(tile) = h_goal(tile) - h_start(tile), twice the forward potential;
+    # ps = P(start), and P(goal) = -ps
+    ps = abs(sx - tx) + abs(sy - ty) if astar else 0
+
+    # Per side: distance and predecessor of every tile, kept in a search
+    # workspace as stamp + distance (see search.py), and a heap of
+    # (key, -distance, index), deepest first between equal keys as in A*; an
+    # entry whose distance is no longer the tile's is stale and skipped.
+    # Going backwards, a tile's predecessors are its walkable neighbours too:
+    # steps between walkable tiles go both ways and the goal is walkable. (A
+    # start inside a wall is only ever left, by the forward side.)
+    #
+    # Keys are 2 * distance + P(tile) - P(start) forwards and
+    # 2 * distance - P(tile) + P(goal) backwards, with P(goal) = -P(start),
+    # so a path through the two frontiers costs at least
+    # (top key sum + 2 * P(start)) / 2.
+    ahead, behind = workspace(grid, 0), workspace(grid, 1)
+    forward = (ahead.dist, ahead.prev, [(0, 0, s)], 1, ahead.begin())
+    backward = (behind.dist, behind.prev, [(0, 0, t)], -1, behind.begin())
+    forward[0][s], forward[1][s] = forward[4], -1
+    backward[0][t], backward[1][t] = backward[4], -1
+    heappush, heappop = heapq.heappush, heapq.heappop
+    # No path is size steps long, and a tile the other side hasn't reached
+    # reads as more than size steps from it, so it never makes a meeting
+    best, meet = grid.size, -1
+    expanded, pushes = 0, 2
+    done = False
+    while not done and forward[2] and backward[2]:
+        # Expand the side with the lower top key until it passes the other's,
+        # which stays put meanwhile
+        if forward[2][0][0] <= backward[2][0][0]:
+            (here, p, heap, sign, stamp), (there, _, limit, _, other) = forward, backward
+        else:
+            (here, p, heap, sign, stamp), (there, _, limit, _, other) = backward, forward
+        limit = limit[0][0]
+        while heap and heap[0][0] <= limit:
+            k, d, u = heappop(heap)
+            d = -d
+            if stamp + d > here[u]:
+                continue  # Stale
+            if k + limit >= 2 * (best - ps):
+                done = True  # No path through the frontiers is shorter than best
+                break
+            expanded += 1
+            new = d + 1
+            new_dist = stamp + new
+            cut = best - new + other  # there[n] below this makes a shorter path
+            for n in neighbours[u]:
+                if new_dist < here[n]:
+                    here[n] = new_dist
+                    p[n] = u
+                    pushes += 1
+                    if astar:
+                        nx, ny = n % cols, n // cols
+                        key = 2 * new + sign * (abs(nx - tx) + abs(ny - ty) - abs(nx - sx) - abs(ny - sy)) - ps
+                    else:
+                        key = 2 * new
+                    heappush(heap, (key, -new, n))
+                    if there[n] < cut:
+                        best, meet = new + there[n] - other, n
+                        cut = there[n]
+    if stats is not None:
+        stats["expanded"] += expanded
+        stats["pushes"] += pushes
+    if meet < 0:
+        return []
+    path = []
+    i = meet
+    while i >= 0:
+        path.append(grid.xy(i))
+        i = forward[1][i]
+    path.reverse()
+    i = backward[1][meet]
+    while i >= 0:
+        path.append(grid.xy(i))
+        i = backward[1][i]
+    return path
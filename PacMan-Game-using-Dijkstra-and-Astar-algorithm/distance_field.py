@@ -0,0 +1,144 @@
+from collections import deque
+from grid import as_grid
+
+DIRECTIONS = [(1,0), (-1,0), (0,1), (0,-1)]
+
+class DistanceField:
+    # Reverse BFS from a single target tile (Pac-Man). Every ghost chasing the
+    # same target reads its next step from this one field instead of running
+    # its own search, so the cost per tick does not grow with the ghost count.
+    def __init__(self, maze, target, stats=None):
+        grid = as_grid(maze)
+        self.rows, self.cols = grid.rows, grid.cols
+        self.target = target
+        # Flat array indexed by y * cols + x; -1 = wall or unreachable
+        self.dist = [-1] * grid.size
+        tx, ty = target
+        if not grid.is_walkable(tx, ty):
+            return
+        dist, neighbours = self.dist, grid.neighbours
+        start = grid.index(tx, ty)
+        dist[start] = 0
+        queue = deque([start])
+        while queue:
+            i = queue.popleft()
+            d = dist[i] + 1
+            for n in neighbours[i]:
+                if dist[n] < 0:
+                    dist[n] = d
+                    queue.append(n)
+        if stats is not None:
+            reached = len(dist) - dist.count(-1)  # Each tile is queued and expanded once
+            stats["expanded"] += reached
+            stats["pushes"] += reached
+
+    def distance(self, x, y):
+        if 0 <= x < self.cols and 0 <= y < self.rows:
+            return self.dist[y * self.cols + x]
+        return -1
+
+    def step_from(self, x, y):
+        # First neighbour one step closer to the target, or None. From a
+        # tile off the field (a ghost respawning inside the ghost house's
+        # wall) it is the neighbour closest to the target, as the grid
+        # searches step out of walls too.
+        d = self.distance(x, y)
+        if d == 0:
+            return None
+        if d < 0:
+            best = None
+            for dx, dy in DIRECTIONS:
+                n = self.distance(x + dx, y + dy)
+                if n >= 0 and (best is None or n < best[0]):
+                    best = (n, (dx, dy))
+            return best[1] if best else None
+        for dx, dy in DIRECTIONS:
+            if self.distance(x + dx, y + dy) == d - 1:
+                return (dx, dy)
+        return None
+
+    def next_direction(self, ghost):
+        step = self.step_from(ghost.x, ghost.y)
+        if step is None:
+            return ghost.dir  # No path found or already at Pac-Man
+        return step
+
+    def full_path(self, start):
+        # Returns a list of (x, y) positions from start to the target, including
+        # both endpoints, or None if the target can't be reached
+        x, y = start
+        step = self.step_from(x, y)
+        if step is None and self.distance(x, y) < 0:
+            return None
+        path = [(x, y)]
+        while step is not None:
+            x, y = x + step[0], y + step[1]
+            path.append((x, y))
+            step = self.step_from(x, y)
+        return path
+
+MARGIN_STEPS = 1  # Ghost moves to spare on a tile before it counts as reached first
+
+class DangerField:
+    # One BFS from every ghost at once, for an Auto-Pilot that minds them.
+    # Chasing ghosts and frightened ones are labelled separately: each tile
+    # is queued at most once per kind, so this is a single linear pass over
+    # the maze however many ghosts there are, instead of a search per ghost.
+    # dist[i] is how many moves the nearest chasing ghost is from tile i and
+    # dist[size + i] the same for frightened ghosts (-1: none can get there).
+    def __init__(self, maze, ghosts, stats=None):
+        grid = as_grid(maze)
+        self.size = size = grid.size
+        self.neighbours = neighbours = grid.neighbours
+        self.dist = dist = [-1] * (2 * size)
+        # Ghosts in the house still count as chasers, even if a power pellet
+        # has frightened them: they can't be eaten until they are out
+        chasers = [g for g in ghosts if not g.frightened or g.respawn_timer > 0]
+        prey = [g for g in ghosts if g.frightened and g.respawn_timer <= 0]
+        self.ghost_ticks = min((g.move_delay for g in chasers), default=0)  # Ticks per ghost move
+        # Frightened ghosts can only be caught while the first of them is
+        self.frightened_ticks = min((g.frightened_timer for g in prey), default=0)
+        queue = deque()
+        for group, base in ((chasers, 0), (prey, size)):
+            for g in group:
+                j = base + grid.index(g.x, g.y)
+                if dist[j] < 0:
+                    dist[j] = 0
+                    queue.append(j)
+        while queue:
+            j = queue.popleft()
+            base = size if j >= size else 0
+            d = dist[j] + 1
+            for n in neighbours[j - base]:
+                n += base
+                if dist[n] < 0:
+                    dist[n] = d
+                    queue.append(n)
+        if stats is not None:
+            reached = len(dist) - dist.count(-1)
+            stats["expanded"] += reached
+            stats["pushes"] += reached
+
+    def safe(self, i, ticks):
+        # Whether Pac-Man can be on tile i in ticks ticks with every chasing
+        # ghost still more than MARGIN_STEPS moves short of it
+        d = self.dist[i]
+        return d < 0 or (d - MARGIN_STEPS) * self.ghost_ticks > ticks
+
+    def chase(self, i, step_ticks):
+        # Safe next tile from i towards the nearest frightened ghost, if
+        # Pac-Man, taking step_ticks per move, gets there while it is still
+        # frightened; else None
+        size, dist = self.size, self.dist
+        d = dist[size + i]
+        if d <= 0 or d * step_ticks >= self.frightened_ticks:
+            return None
+        for n in self.neighbours[i]:
+            if dist[size + n] == d - 1 and self.safe(n, step_ticks):
+                return n
+        return None
+
+    def flee(self, i):
+        # Neighbour of i farthest from the chasing ghosts, or None
+        dist = self.dist
+        return max(self.neighbours[i], key=lambda n: dist[n] if dist[n] >= 0 else self.size, default=None)
@@ -0,0 +1,146 @@
+import heapq
+from grid import as_grid
+
+class DStarLite:
+    # Incremental shortest paths (D* Lite, Koenig & Likhachev) on a Grid whose
+    # doors open and close while the game runs. The search runs backwards
+    # from the goal, so g[i] is the distance from tile i to the goal, and it
+    # is kept between calls:
+    #   - the mover (start) walking along the path costs nothing but a key
+    #     offset (km), which is what D* Lite is built for;
+    #   - tiles flipping between open and blocked (cells_changed) only
+    #     re-examine the tiles whose distance really changed;
+    #   - the goal moving re-roots the search: the new goal gets rhs 0 and the
+    #     old one is recomputed from its neighbours, and the repair is left to
+    #     the same loop. A goal that keeps moving (Pac-Man, for a ghost)
+    #     repairs as much as a fresh search and runs several times slower,
+    #     so only fixed goals (the Auto-Pilot's pellet) use this.
+    # Costs are 1 per step and the heuristic is the Manhattan distance to the
+    # start. Start and goal must be walkable; callers fall back to get_path
+    # for the rare query from inside a wall or a closed door.
+    def __init__(self, maze, start, goal):
+        self.grid = as_grid(maze)
+        self.inf = self.grid.size + 1  # Longer than any path
+        self.g = [self.inf] * self.grid.size
+        self.rhs = [self.inf] * self.grid.size
+        self.keys = {}  # Inconsistent tile -> its key in the heap; older heap entries are stale
+        self.heap = []
+        self.km = 0
+        self.expanded = self.pushes = 0  # Work done by the current path() call
+        self.start = self.grid.index(*start)
+        self.goal = self.grid.index(*goal)
+        self.rhs[self.goal] = 0
+        self._queue(self.goal)
+
+    def _h(self, i):
+        cols, s = self.grid.cols, self.start
+        return abs(i % cols - s % cols) + abs(i // cols - s // cols)
+
+    def _key(self, i):
+        m = min(self.g[i], self.rhs[i])
+        return (m + self._h(i) + self.km, m)
+
+    def _queue(self, i):
+        # Puts i in the open list if it is inconsistent, else takes it out
+        if self.g[i] != self.rhs[i]:
+            key = self._key(i)
+            if self.keys.get(i) != key:
+                self.keys[i] = key
+                heapq.heappush(self.heap, (key, i))
+                self.pushes += 1
+        else:
+            self.keys.pop(i, None)
+
+    def _update(self, i):
+        # Recomputes rhs from i's open neighbours; blocked tiles lead nowhere
+        if i != self.goal:
+            grid = self.grid
+            x, y = grid.xy(i)
+            if grid.is_walkable(x, y):
+                g = self.g
+                self.rhs[i] = min((g[n] for n in grid.neighbours[i]), default=self.inf - 1) + 1
+                if self.rhs[i] > self.inf:
+                    self.rhs[i] = self.inf
+            else:
+                self.rhs[i] = self.inf
+        self._queue(i)
+
+    def _compute(self):
+        g, rhs, keys, heap = self.g, self.rhs, self.keys, self.heap
+        neighbours, start = self.grid.neighbours, self.start
+        while heap:
+            key, u = heap[0]
+            if keys.get(u) != key:
+                heapq.heappop(heap)  # Stale entry
+                continue
+            if key >= self._key(start) and rhs[start] <= g[start]:
+                break
+            heapq.heappop(heap)
+            self.expanded += 1
+            new_key = self._key(u)
+            if key < new_key:
+                keys[u] = new_key  # Start moved since u was queued
+                heapq.heappush(heap, (new_key, u))
+                self.pushes += 1
+            elif g[u] > rhs[u]:
+                g[u] = rhs[u]
+                del keys[u]
+                for p in neighbours[u]:
+                    self._update(p)
+            else:
+                g[u] = self.inf
+                self._update(u)
+                for p in neighbours[u]:
+                    self._update(p)
+
+    def move_start(self, start):
+        start = self.grid.index(*start)
+        if start != self.start:
+            self.km += self._h(start)  # h from the old start, since _h still uses it
+            self.start = start
+
+    def move_goal(self, goal):
+        goal = self.grid.index(*goal)
+        if goal != self.goal:
+            old, self.goal = self.goal, goal
+            self.rhs[goal] = 0
+            self._queue(goal)
+            self._update(old)
+
+    def cells_changed(self, cells):
+        # Tiles (flat indices) whose walkability flipped; the grid's neighbour
+        # lists already reflect the change
+        neighbours = self.grid.neighbours
+        for i in cells:
+            self._update(i)
+            for n in neighbours[i]:
+                self._update(n)
+
+    def path(self, start, goal, stats=None):
+        # Returns a list of (x, y) positions from start to goal (including
+        # both), or [] if there is no path
+        self.expanded = self.pushes = 0
+        self.move_start(start)
+        self.move_goal(goal)
+        self._compute()
+        if stats is not None:
+            stats["expanded"] += self.expanded
+            stats["pushes"] += self.pushes
+        grid, g = self.grid, self.g
+        i = self.start
+        if self.rhs[i] >= self.inf:
+            return []  # rhs, not g: the start may still be overconsistent
+        path = [grid.xy(i)]
+        while i != self.goal:
+            # Neighbours come in DIRECTIONS order; the first best one wins
+            i = min(grid.neighbours[i], key=g.__getitem__)
+            if g[i] >= self.inf or len(path) > grid.size:
+                return []
+            path.append(grid.xy(i))
+        return path
+
+    def next_direction(self, ghost, pacman, stats=None):
+        path = self.path((ghost.x, ghost.y), (pacman.x, pacman.y), stats)
+        if len(path) < 2:
+            return ghost.dir  # No path found or already at Pac-Man
+        return (path[1][0] - path[0][0], path[1][1] - path[0][1])
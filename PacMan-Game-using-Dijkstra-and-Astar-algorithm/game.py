@@ -0,0 +1,471 @@
+import time
+from dijkstra import dijkstra_next_direction
+from astar import astar_next_direction
+from jps import jps_next_direction, jps_path
+from bidirectional import bidirectional_path
+from search import shortest_path
+from distance_field import DangerField, DistanceField
+from junction_graph import JunctionGraph
+from path_cache import PathCache
+from autopilot import AutoPilot, bfs_path
+from grid import DOT, EMPTY, POWER, FRUIT, OBSTACLE, Grid, as_grid
+from level import Level
+
+# Headless game rules: everything that happens in a tick, with no pygame
+# import, display, fonts or frame limiter. main.py draws a GameState; tools
+# that only need the simulation can step it as fast as the CPU allows.
+
+# Constants
+FPS = 60  # Simulation ticks per second; timers below are counted in ticks
+PACMAN_MOVE_DELAY = 6  # Ticks per tile
+GHOST_MOVE_DELAY = 8
+MOUTH_STEP = 0.02  # Radians Pac-Man's mouth opens or closes per tick at FPS
+GHOST_HOUSE_X, GHOST_HOUSE_Y = 7, 8  # Pick a central, safe tile
+PACMAN_START = (7, 10)
+GHOST_STARTS = [(6, 5), (7, 5), (8, 5), (7, 6)]
+ALGORITHMS = ["dijkstra", "astar", "jps"]  # TAB cycles through these in order
+DOOR_PERIOD = FPS * 5  # Ticks between door (tile 5) openings and closings
+
+# Colors
+BLACK = (0, 0, 0)
+BLUE = (33, 33, 222)
+YELLOW = (255, 255, 0)
+WHITE = (255, 255, 255)
+RED = (222, 33, 33)
+PINK = (255, 184, 255)
+ORANGE = (255, 184, 82)
+CYAN = (0, 255, 255)
+GREEN = (0, 255, 0)
+
+# Maze layout (1 = wall, 0 = dot, 2 = empty, 3 = power pellet, 4 = fruit, 5 = dynamic obstacle)
+MAZE = [
+    [1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1],
+    [1,3,0,0,1,0,0,0,0,1,0,0,3,0,0,0,3,1],
+    [1,0,1,0,1,0,1,1,0,1,0,1,0,1,0,1,0,1],
+    [1,0,1,0,0,4,0,0,0,0,0,1,0,0,0,1,0,1],
+    [1,0,1,0,1,1,0,0,1,1,0,1,0,1,0,1,0,1],
+    [1,0,0,0,1,0,0,0,0,1,0,0,0,1,0,0,0,1],
+    [1,1,1,0,1,0,1,1,0,1,0,1,1,1,0,1,1,1],
+    [2,2,1,0,0,0,0,0,0,0,0,1,0,4,0,1,2,2],
+    [1,1,1,0,1,1,1,1,1,1,0,1,1,1,0,1,1,1],
+    [1,0,4,0,1,0,0,0,0,1,0,0,0,1,0,0,0,1],
+    [1,0,1,1,1,0,1,1,0,1,1,1,0,1,1,1,0,1],
+    [1,3,0,0,0,0,1,1,0,0,0,0,3,0,0,0,3,1],
+    [1,0,1,0,1,0,1,1,0,1,0,1,0,1,0,1,0,1],
+    [1,0,1,0,0,0,0,0,4,0,0,1,0,0,0,1,0,1],
+    [1,0,1,0,1,1,0,0,1,1,0,1,0,1,0,1,0,1],
+    [1,0,0,0,1,0,0,0,0,1,0,0,0,1,0,0,0,1],
+    [1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1]
+]
+
+# The built-in level; other levels come from level files (level.py)
+CLASSIC = Level("classic", Grid.from_rows(MAZE), PACMAN_START, GHOST_STARTS, (GHOST_HOUSE_X, GHOST_HOUSE_Y))
+GHOST_COLORS = [RED, PINK, CYAN, ORANGE]  # Cycled when a level has more ghosts
+
+def as_level(maze):
+    # Levels pass through; a plain maze (rows or Grid) gets the classic spawns
+    if isinstance(maze, Level):
+        return maze
+    return Level("custom", as_grid(maze), PACMAN_START, GHOST_STARTS, (GHOST_HOUSE_X, GHOST_HOUSE_Y))
+
+class Entity:
+    def __init__(self, x, y, color, is_pacman=False, move_delay=1):
+        self.x = x
+        self.y = y
+        self.last_x, self.last_y = x, y  # Tile before the latest move, for drawing between tiles
+        self.start_x = x  # For respawning
+        self.start_y = y
+        self.color = color
+        self.dir = (0, 0)
+        self.is_pacman = is_pacman
+        self.move_delay = move_delay
+        self.move_counter = 0
+        self.frightened = False
+        self.frightened_timer = 0
+        self.respawn_timer = 0
+        self.next_dir = (0, 0)
+        if is_pacman:
+            self.mouth_angle = 0.25  # radians, initial mouth open
+            self.mouth_direction = 1  # 1 = opening, -1 = closing
+            self.mouth_step = MOUTH_STEP  # Per animate_mouth() call
+
+    def move(self, maze):
+        nx, ny = self.x + self.dir[0], self.y + self.dir[1]
+        self.last_x, self.last_y = self.x, self.y
+        if maze.is_walkable(nx, ny):
+            self.x, self.y = nx, ny
+
+    def place(self, x, y):
+        # Jumps to (x, y) without a move to draw between
+        self.x, self.y = x, y
+        self.last_x, self.last_y = x, y
+
+    def render_pos(self, alpha):
+        # Fractional (x, y) to draw at, alpha ticks after the current one. A
+        # move is spread over the move_delay ticks that follow it, so the
+        # entity glides into its tile just as its next move is due; that
+        # draws it up to one tile behind the simulation. Jumps (respawns,
+        # lost lives) are drawn where they land.
+        lx, ly = self.last_x, self.last_y
+        if abs(self.x - lx) + abs(self.y - ly) != 1:
+            return self.x, self.y
+        t = min(1.0, (self.move_counter + alpha) / self.move_delay)
+        return lx + (self.x - lx) * t, ly + (self.y - ly) * t
+
+    def animate_mouth(self):
+        # Animate mouth between 0.05 and 0.25 radians
+        if self.is_pacman:
+            self.mouth_angle += self.mouth_step * self.mouth_direction
+            if self.mouth_angle > 0.25:
+                self.mouth_angle = 0.25
+                self.mouth_direction = -1
+            elif self.mouth_angle < 0.05:
+                self.mouth_angle = 0.05
+                self.mouth_direction = 1
+
+    def move_with_delay(self, maze):
+        self.move_counter += 1
+        if self.move_counter >= self.move_delay:
+            self.move(maze)
+            self.move_counter = 0
+
+def is_walkable(x, y, maze):
+    return as_grid(maze).is_walkable(x, y)
+
+def find_nearest_pellet(start_x, start_y, maze, stats=None):
+    # Closest dot or power pellet to Pac-Man, or None
+    grid = as_grid(maze)
+    path = bfs_path(grid, grid.index(start_x, start_y), grid.pellet_cells, stats)
+    return grid.xy(path[-1]) if path else None
+
+def get_path(start, goal, maze, algorithm, table=None, stats=None):
+    # Returns a list of (x, y) positions from start to goal (including both)
+    if table is not None:
+        return table.path(start, goal)
+    if algorithm == "jps":
+        return jps_path(start, goal, maze, stats)
+    return shortest_path(start, goal, maze, algorithm, stats)
+
+def get_full_path(ghost, pacman, maze, algorithm, table=None, stats=None):
+    # Returns a list of (x, y) positions from ghost to Pac-Man, including both
+    # endpoints, or None if Pac-Man can't be reached. Only the debug overlay
+    # draws these, so Dijkstra searches from both ends; the path may be a
+    # different one of equal length from the one the ghost follows. A* stays
+    # one-sided, which is faster on big open levels than from both ends.
+    start, goal = (ghost.x, ghost.y), (pacman.x, pacman.y)
+    if table is None and algorithm == "dijkstra":
+        path = bidirectional_path(start, goal, maze, algorithm, stats)
+    else:
+        path = get_path(start, goal, maze, algorithm, table, stats)
+    return path or None
+
+class GameState:
+    def __init__(self, maze=CLASSIC, algorithm="dijkstra", distance_field=False, table=None, junction_graph=False,
+                 record_stats=False, pellet_tour=False, path_cache=True, incremental=False,
+                 door_period=None, tick_rate=FPS, danger_field=False):
+        # maze is a Level, or a maze (Grid or rows) played with the classic spawns
+        self.level = as_level(maze)
+        # Pellets are eaten from this copy, which shares the level's indices
+        self.maze = self.level.grid.copy()
+        # Speeds, timers and door_period are given in ticks at FPS; a
+        # different tick_rate rescales them so the game plays at the same
+        # speed in finer (or coarser) steps
+        self.tick_rate = tick_rate
+        pacman_delay, ghost_delay = self.ticks(PACMAN_MOVE_DELAY), self.ticks(GHOST_MOVE_DELAY)
+        self.pacman = Entity(*self.level.pacman_start, YELLOW, is_pacman=True, move_delay=pacman_delay)
+        self.pacman.mouth_step = MOUTH_STEP * FPS / tick_rate  # Animated once per tick
+        self.ghosts = [Entity(*start, GHOST_COLORS[i % len(GHOST_COLORS)], move_delay=ghost_delay)
+                       for i, start in enumerate(self.level.ghost_starts)]
+        self.score = 0
+        self.lives = 3
+        self.algorithm = algorithm
+        self.distance_field = distance_field  # Share one BFS field from Pac-Man between all ghosts
+        # Tiles that start out as closed doors; they all open and close
+        # together every door_period ticks (the level's, else DOOR_PERIOD)
+        if door_period is None:
+            door_period = self.level.door_period or DOOR_PERIOD
+        self.doors = [i for i, tile in enumerate(self.maze.cells) if tile == OBSTACLE]
+        self.door_period = self.ticks(door_period)
+        # The next-hop table and junction graph assume walls never change, so
+        # they are only used on levels without doors
+        self.table = table if not self.doors else None  # Optional NextHopTable for the wall layout
+        # Optional corridor-contracted graph to search on instead of the tile grid
+        self.junctions = JunctionGraph(self.maze) if junction_graph and not self.doors else None
+        # Per-ghost paths reused while Pac-Man stays put or moves by one tile
+        self.path_cache = PathCache() if path_cache else None
+        self.auto_pilot = False  # Auto-Pilot mode
+        # Route to the nearest pellet, or a tour of the last ones with
+        # pellet_tour; with incremental, a route to one pellet is repaired by
+        # D* Lite when doors move. Ghosts always search afresh: their goal is
+        # Pac-Man, who moves every few ticks, and a D* Lite search rooted at
+        # a moving goal costs more than a new search.
+        self.pilot = AutoPilot(self.maze, tour=pellet_tour, incremental=incremental, step_ticks=pacman_delay)
+        # Auto-Pilot minds the ghosts through one multi-source BFS per move
+        self.danger_field = danger_field
+        self.tick = 0
+        self.running = True
+        self.won = False
+        self.lost_life = False  # Set for the tick in which Pac-Man lost a life
+        self.field = None  # Distance field to Pac-Man, rebuilt when he changes tile
+        # Cost of every pathfinding call, when asked for (tournaments, benchmarks)
+        self.search_stats = {"calls": 0, "expanded": 0, "pushes": 0, "seconds": 0.0} if record_stats else None
+        self.profiler = None  # Optional profiler.Profiler timing ghosts, Auto-Pilot and searches
+        # Optional planning.PlanningWorker running ghost and Auto-Pilot
+        # searches in the background, in place of the search options above
+        self.planning = None
+        # Optional server.SearchBatch shared by games stepped together; it
+        # runs each distinct ghost search of a tick once for all of them
+        self.search_batch = None
+        self.changed_tiles = None  # Optional list collecting the (x, y) of every tile set
+
+    def ticks(self, n):
+        # n ticks at FPS, in ticks at this game's tick_rate
+        return max(1, round(n * self.tick_rate / FPS))
+
+    # --- Input ---
+
+    def toggle_auto_pilot(self):
+        self.auto_pilot = not self.auto_pilot
+        self.pilot.reset()
+
+    def toggle_algorithm(self):
+        self.algorithm = ALGORITHMS[(ALGORITHMS.index(self.algorithm) + 1) % len(ALGORITHMS)]
+
+    def toggle_distance_field(self):
+        self.distance_field = not self.distance_field
+
+    # --- Queries shared with the renderer ---
+
+    def pacman_field(self):
+        # The field is rebuilt lazily whenever Pac-Man has changed tile
+        target = (self.pacman.x, self.pacman.y)
+        if self.field is None or self.field.target != target:
+            field = DistanceField if self.search_batch is None else self.search_batch.distance_field
+            self.field = self._search(field, self.maze, target)
+        return self.field
+
+    def _search(self, fn, *args):
+        # Runs one pathfinding call, adding its cost to search_stats and the
+        # profiler when either is enabled
+        stats, profiler = self.search_stats, self.profiler
+        if stats is None and profiler is None:
+            return fn(*args)
+        cost = {"expanded": 0, "pushes": 0}
+        start = time.perf_counter()
+        result = fn(*args, stats=cost)
+        end = time.perf_counter()
+        if stats is not None:
+            stats["seconds"] += end - start
+            stats["calls"] += 1
+            stats["expanded"] += cost["expanded"]
+            stats["pushes"] += cost["pushes"]
+        if profiler is not None:
+            profiler.search(fn.__name__, start, end, cost, result)
+        return result
+
+    def ghost_direction(self, ghost):
+        if self.planning is not None:
+            return self._planned_direction(ghost)
+        if self.distance_field:
+            return self.pacman_field().next_direction(ghost)
+        target = (self.pacman.x, self.pacman.y)
+        if self.path_cache is not None and self.table is None:
+            return self.path_cache.next_direction(ghost, target, self.plan_path)
+        if self.junctions is not None and self.table is None:
+            return self._search(self.junctions.next_direction, ghost, self.pacman, self.algorithm)
+        if self.algorithm == "dijkstra":
+            return self._search(dijkstra_next_direction, ghost, self.pacman, self.maze, self.table)
+        if self.algorithm == "jps":
+            return self._search(jps_next_direction, ghost, self.pacman, self.maze, self.table)
+        return self._search(astar_next_direction, ghost, self.pacman, self.maze, self.table)
+
+    def _planned_direction(self, ghost):
+        # Steers along the newest path the planning worker has finished for
+        # this ghost, and asks for one from here. Until the first arrives, or
+        # once the ghost is off the path, it keeps going the way it was.
+        here = (ghost.x, ghost.y)
+        doors = self.tick // self.door_period if self.doors else 0  # Replan when doors move
+        self.planning.submit(ghost, ("path", here, (self.pacman.x, self.pacman.y), self.algorithm, doors))
+        steps = self.planning.latest(ghost)
+        step = steps.get(here) if steps else None
+        if step is None:
+            return ghost.dir
+        return (step[0] - here[0], step[1] - here[1])
+
+    def _planned_route(self, next_pos):
+        # Auto-Pilot counterpart, given the next tile on the current route
+        # (None when it is used up). The route to the following pellet is
+        # asked for on the way to the last one, so it is usually waiting on
+        # arrival; without a route, the newest one is taken if it still fits.
+        pacman, pilot, planning = self.pacman, self.pilot, self.planning
+        if next_pos is not None:
+            if len(pilot.route) == 1:
+                planning.submit(pilot, ("pellet", next_pos))
+            return next_pos
+        route = planning.take(pilot)
+        if route is not None:
+            pilot.follow(route)
+            next_pos = pilot.next_tile(pacman.x, pacman.y)
+            if next_pos is not None:
+                return next_pos
+        planning.submit(pilot, ("pellet", (pacman.x, pacman.y)))
+        return None
+
+    def ghost_path(self, ghost):
+        # Full path from a ghost to Pac-Man for the debug overlay
+        if self.distance_field:
+            return self.pacman_field().full_path((ghost.x, ghost.y))
+        if self.junctions is not None and self.table is None:
+            return self.plan_path((ghost.x, ghost.y), (self.pacman.x, self.pacman.y)) or None
+        return self._search(get_full_path, ghost, self.pacman, self.maze, self.algorithm, self.table)
+
+    def plan_path(self, start, goal):
+        # Tile path from start to goal (including both) with the current settings
+        if self.junctions is not None and self.table is None:
+            return self._search(self.junctions.path, start, goal, self.algorithm)
+        search = get_path if self.search_batch is None else self.search_batch.get_path
+        return self._search(search, start, goal, self.maze, self.algorithm, self.table)
+
+    def pellets_left(self):
+        return self.maze.pellets
+
+    # --- Simulation ---
+
+    def step(self, action=None):
+        # Advances the game by one tick. action is a direction picked by the
+        # player (which switches Auto-Pilot off) or None to keep going.
+        if not self.running:
+            return
+        self.tick += 1
+        self.lost_life = False
+        if self.doors and self.tick % self.door_period == 0:
+            if self.profiler is not None:
+                self.profiler.push("doors")
+            self._toggle_doors()
+            if self.profiler is not None:
+                self.profiler.pop()
+        if action is not None:
+            self.pacman.next_dir = action
+            self.auto_pilot = False
+        self._move_pacman()
+        self._eat()
+        self._move_ghosts()
+        if self.running and self.pellets_left() == 0:
+            self.won = True
+            self.running = False
+
+    def _toggle_doors(self):
+        maze = self.maze
+        changes = []
+        for i in self.doors:
+            x, y = maze.xy(i)
+            changes.append((x, y, EMPTY if maze.get(x, y) == OBSTACLE else OBSTACLE))
+        self._set_tiles(changes)
+        # Everything planned on the old layout is repaired or dropped
+        self.field = None
+        if self.path_cache is not None:
+            self.path_cache.clear()
+        self._search(self.pilot.cells_changed, self.doors, self.pacman.x, self.pacman.y)
+
+    def _move_pacman(self):
+        pacman, maze = self.pacman, self.maze
+        if self.auto_pilot:
+            # Replan only when the target is gone or Pac-Man left the route
+            if self.profiler is not None:
+                self.profiler.push("autopilot")
+            if self.danger_field and pacman.move_counter + 1 >= pacman.move_delay:
+                # Only the direction on the tick Pac-Man moves matters
+                self.pilot.danger = self._search(DangerField, self.maze, self.ghosts)
+            next_pos = self.pilot.next_tile(pacman.x, pacman.y)
+            if self.planning is not None and not self.danger_field:  # The worker's routes ignore ghosts
+                next_pos = self._planned_route(next_pos)
+            elif next_pos is None:
+                next_pos = self._search(self.pilot.plan, pacman.x, pacman.y)
+            if self.profiler is not None:
+                self.profiler.pop(route=len(self.pilot.route))
+            if next_pos is not None:
+                dx, dy = next_pos[0] - pacman.x, next_pos[1] - pacman.y
+                pacman.next_dir = (dx, dy)
+                nx, ny = pacman.x + dx, pacman.y + dy
+                if maze.is_walkable(nx, ny):
+                    pacman.dir = pacman.next_dir
+                pacman.move_with_delay(maze)
+                pacman.animate_mouth()
+            else:
+                pacman.animate_mouth()
+        else:
+            nx, ny = pacman.x + pacman.next_dir[0], pacman.y + pacman.next_dir[1]
+            if maze.is_walkable(nx, ny):
+                pacman.dir = pacman.next_dir
+            pacman.move_with_delay(maze)
+            pacman.animate_mouth()
+
+    def _eat(self):
+        # Eat dots and power pellets
+        x, y = self.pacman.x, self.pacman.y
+        tile = self.maze.get(x, y)
+        if tile == DOT:
+            self._set_tile(x, y, EMPTY)
+            self.score += 10
+        elif tile == POWER:
+            self._set_tile(x, y, EMPTY)
+            self.score += 50
+            for ghost in self.ghosts:
+                ghost.frightened = True
+                ghost.frightened_timer = self.ticks(FPS * 7)  # 7 seconds
+        elif tile == FRUIT:
+            self._set_tile(x, y, EMPTY)
+            self.score += 100
+
+    def _set_tile(self, x, y, tile):
+        self._set_tiles([(x, y, tile)])
+
+    def _set_tiles(self, changes):
+        self.maze.set_many(changes)
+        for x, y, tile in changes:
+            if self.planning is not None:
+                self.planning.tile_changed(x, y, tile)
+            if self.changed_tiles is not None:
+                self.changed_tiles.append((x, y))
+
+    def _move_ghosts(self):
+        # Move ghosts (using selected algorithm)
+        pacman, profiler = self.pacman, self.profiler
+        for i, ghost in enumerate(self.ghosts):
+            if ghost.respawn_timer > 0:
+                ghost.respawn_timer -= 1
+                continue  # Skip movement and collision for this ghost
+
+            if ghost.frightened:
+                ghost.frightened_timer -= 1
+                if ghost.frightened_timer <= 0:
+                    ghost.frightened = False
+            elif ghost.move_counter + 1 >= ghost.move_delay:
+                # Only the direction on the tick the ghost moves matters
+                if profiler is not None:
+                    profiler.push(f"ghost {i}")
+                ghost.dir = self.ghost_direction(ghost)
+                if profiler is not None:
+                    profiler.pop()
+            ghost.move_with_delay(self.maze)
+            # Check collision
+            if ghost.x == pacman.x and ghost.y == pacman.y:
+                if ghost.frightened:
+                    self.score += 200
+                    ghost.place(*self.level.ghost_house)
+                    ghost.frightened = False
+                    ghost.frightened_timer = 0
+                    ghost.respawn_timer = self.ticks(FPS * 2)
+                    continue
+                self.lives -= 1
+                if self.lives == 0:
+                    self.running = False
+                    return
+                # Reset positions
+                pacman.place(*self.level.pacman_start)
+                pacman.dir = (0, 0)
+                for g in self.ghosts:
+                    g.place(g.start_x, g.start_y)
+                    g.dir = (0, 0)
+                self.lost_life = True
+                return
@@ -0,0 +1,158 @@
+DIRECTIONS = [(1,0), (-1,0), (0,1), (0,-1)]
+
+# Tile values, as in the MAZE legend. OBSTACLE is a closed door: it blocks
+# like a wall, but can be opened and closed while the game runs.
+DOT, WALL, EMPTY, POWER, FRUIT, OBSTACLE = 0, 1, 2, 3, 4, 5
+
+class Grid:
+    # The maze as one flat bytearray indexed by y * cols + x. Every cell
+    # (walls included, since Pac-Man spawns inside one) has a precomputed
+    # tuple of walkable neighbour indices in DIRECTIONS order, and the set of
+    # dots and power pellets left is kept up to date by set(), so "pellets
+    # left", the win check and the autopilot never scan the maze.
+    def __init__(self, rows, cols, cells, pellet_cells=None, neighbours=None):
+        self.rows, self.cols = rows, cols
+        self.size = rows * cols
+        self.cells = bytearray(cells)
+        # Flat indices of the dots and power pellets still on the board;
+        # compiled levels pass these and the neighbour lists in ready-made
+        if pellet_cells is None:
+            pellet_cells = {i for i, tile in enumerate(self.cells) if tile == DOT or tile == POWER}
+        self.pellet_cells = set(pellet_cells)
+        free = _pad_walkable(self)
+        self.neighbours = neighbours if neighbours is not None else _neighbour_lists(self, free)
+        self._derived = {"padded_walkable": (self.neighbours, free)}  # name -> (neighbour list it was built for, data)
+
+    @classmethod
+    def from_rows(cls, maze):
+        # Builds a grid from a list of rows such as MAZE
+        return cls(len(maze), len(maze[0]), bytes(tile for row in maze for tile in row))
+
+    def copy(self):
+        # Copies the tiles; neighbour lists depend only on walls and are shared
+        grid = Grid.__new__(Grid)
+        grid.rows, grid.cols, grid.size = self.rows, self.cols, self.size
+        grid.cells = bytearray(self.cells)
+        grid.pellet_cells = set(self.pellet_cells)
+        grid.neighbours = self.neighbours
+        grid._derived = dict(self._derived)
+        return grid
+
+    @property
+    def pellets(self):
+        return len(self.pellet_cells)
+
+    def _walkable_neighbours(self, i):
+        x, y = i % self.cols, i // self.cols
+        return tuple((y + dy) * self.cols + x + dx for dx, dy in DIRECTIONS
+                     if self.is_walkable(x + dx, y + dy))
+
+    def index(self, x, y):
+        return y * self.cols + x
+
+    def xy(self, i):
+        return i % self.cols, i // self.cols
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.cols and 0 <= y < self.rows
+
+    def get(self, x, y):
+        return self.cells[y * self.cols + x]
+
+    def set(self, x, y, tile):
+        self.set_many([(x, y, tile)])
+
+    def set_many(self, changes):
+        # Sets each (x, y, tile) of changes. When walkability changes, the
+        # neighbour lists are copied once for all of them, so a batch of
+        # doors costs one copy rather than one per door.
+        cols, cells, pellets = self.cols, self.cells, self.pellet_cells
+        flipped = []
+        for x, y, tile in changes:
+            i = y * cols + x
+            old = cells[i]
+            if tile == DOT or tile == POWER:
+                pellets.add(i)
+            else:
+                pellets.discard(i)
+            cells[i] = tile
+            if (old == WALL or old == OBSTACLE) != (tile == WALL or tile == OBSTACLE):
+                flipped.append((x, y))
+        if flipped:
+            # Refresh these cells and the ones around them, on a private copy
+            # of the neighbour lists
+            self.neighbours = list(self.neighbours)
+            for x, y in flipped:
+                around = tuple(self.index(x + dx, y + dy) for dx, dy in DIRECTIONS if self.in_bounds(x + dx, y + dy))
+                for j in (y * cols + x,) + around:
+                    self.neighbours[j] = self._walkable_neighbours(j)
+
+    def derived(self, name, build):
+        # Data computed from the walls by build(grid), cached until
+        # walkability changes; set_many() always replaces the neighbour list then
+        cached = self._derived.get(name)
+        if cached is None or cached[0] is not self.neighbours:
+            cached = self._derived[name] = (self.neighbours, build(self))
+        return cached[1]
+
+    def share_neighbours(self, layouts):
+        # Swaps the neighbour lists for equal ones from layouts (a dict kept
+        # by the caller for grids of one level), adding them if they are new,
+        # so grids whose doors are in the same state share one set of lists
+        free = self.padded_walkable()
+        shared = layouts.setdefault(free, (self.neighbours, free))
+        if shared[0] is not self.neighbours:
+            self.neighbours = shared[0]
+            self._derived = {"padded_walkable": shared}
+        return self.neighbours
+
+    def padded_walkable(self):
+        # bytes of (rows + 2) x (cols + 2), 1 for walkable tiles, with a
+        # blocked border so scans need no bounds checks
+        return self.derived("padded_walkable", _pad_walkable)
+
+    def junctions(self):
+        # Flat indices of the walkable tiles that are not plain corridor
+        # tiles (junctions and dead ends: other than two open neighbours)
+        return self.derived("junctions", _find_junctions)
+
+    def is_walkable(self, x, y):
+        if 0 <= x < self.cols and 0 <= y < self.rows:
+            tile = self.cells[y * self.cols + x]
+            return tile != WALL and tile != OBSTACLE
+        return False
+
+    def is_pellet(self, x, y):
+        tile = self.cells[y * self.cols + x]
+        return tile == DOT or tile == POWER
+
+    def to_rows(self):
+        return [list(self.cells[y * self.cols:(y + 1) * self.cols]) for y in range(self.rows)]
+
+def _pad_walkable(grid):
+    cols = grid.cols
+    border = bytes(cols + 2)
+    free = bytes(0 if tile == WALL or tile == OBSTACLE else 1 for tile in grid.cells)
+    return border + b"".join(b"\0" + free[y * cols:(y + 1) * cols] + b"\0" for y in range(grid.rows)) + border
+
+def _neighbour_lists(grid, free):
+    # All the neighbour tuples at once: a 4-bit mask of open sides per tile,
+    # read a row at a time from the padded mask, picks the offsets to add
+    cols, W = grid.cols, grid.cols + 2
+    offsets = [tuple(o for k, o in enumerate((1, -1, cols, -cols)) if mask >> k & 1) for mask in range(16)]
+    masks = bytearray()
+    for y in range(grid.rows):
+        p = (y + 1) * W + 1
+        sides = zip(free[p + 1:p + 1 + cols], free[p - 1:p - 1 + cols], free[p + W:p + W + cols], free[p - W:p - W + cols])
+        masks += bytes(e | w << 1 | s << 2 | n << 3 for e, w, s, n in sides)
+    return [tuple(i + o for o in offsets[mask]) for i, mask in enumerate(masks)]
+
+def _find_junctions(grid):
+    free = grid.padded_walkable()
+    W = grid.cols + 2
+    return [i for i, n in enumerate(grid.neighbours)
+            if len(n) != 2 and free[(i // grid.cols + 1) * W + i % grid.cols + 1]]
+
+def as_grid(maze):
+    # Lets the search functions keep accepting plain lists of rows
+    return maze if isinstance(maze, Grid) else Grid.from_rows(maze)
@@ -0,0 +1,148 @@
+import heapq
+from array import array
+from grid import as_grid
+
+# Jump Point Search for 4-connected grids (the "never move diagonally"
+# variant of Harabor & Grastien's JPS, as in PathFinding.js). From each node
+# the search scans straight ahead and only stops, and pushes, at jump
+# points: the goal, tiles with a forced neighbour, or, on vertical scans,
+# tiles from which a horizontal scan finds one. On open floor that skips the
+# long runs of symmetric equal-cost paths plain A* pushes tile by tile.
+# Path lengths are the same as Dijkstra's and A*'s.
+#
+# Apart from the goal, where a scan stops depends only on the walls, so the
+# stops are worked out once per wall layout (as in JPS+) and cached on the
+# grid; a query only checks whether the goal cuts a scan short. Tiles are
+# indexed into the grid's padded walkable mask: (y + 1) * W + x + 1.
+
+def _scan_table(grid):
+    # For every tile and direction (east, west, south, north): the first jump
+    # point a scan starting there stops at, not counting the goal, or ~w when
+    # it runs into the blocked tile w first
+    free = grid.padded_walkable()
+    W = grid.cols + 2
+    east, west, south, north = (array("i", [0]) * len(free) for _ in range(4))
+    for y in range(1, grid.rows + 1):
+        for d, stops, xs in ((1, east, range(W - 1, -1, -1)), (-1, west, range(W))):
+            stop = 0
+            for x in xs:
+                p = y * W + x
+                if not free[p]:
+                    stop = ~p
+                elif free[p - W] and not free[p - d - W] or free[p + W] and not free[p - d + W]:
+                    stop = p
+                stops[p] = stop
+    for x in range(1, grid.cols + 1):
+        for d, stops, ys in ((W, south, range(grid.rows + 1, -1, -1)), (-W, north, range(grid.rows + 2))):
+            stop = 0
+            for y in ys:
+                p = y * W + x
+                if not free[p]:
+                    stop = ~p
+                elif (free[p - 1] and not free[p - 1 - d] or free[p + 1] and not free[p + 1 - d]
+                        or east[p + 1] >= 0 or west[p - 1] >= 0):
+                    stop = p
+                stops[p] = stop
+    return east, west, south, north
+
+def jps_path(start, goal, maze, stats=None):
+    # Returns a list of (x, y) positions from start to goal (including both),
+    # or [] if there is no path
+    grid = as_grid(maze)
+    free = grid.padded_walkable()
+    east, west, south, north = grid.derived("jps_scans", _scan_table)
+    W = grid.cols + 2
+    gx, gy = goal
+    pg = (gy + 1) * W + gx + 1
+
+    def jump_x(p, d):
+        # Scans along a row (d = +-1); returns the first jump point, or None
+        # at a wall
+        stop = east[p] if d == 1 else west[p]
+        last = stop if stop >= 0 else ~stop - d  # Last tile the scan covers
+        if (pg - p) * d >= 0 and (last - pg) * d >= 0 and pg // W == p // W:
+            return pg
+        return stop if stop >= 0 else None
+
+    def jump_y(p, d):
+        # Scans along a column (d = +-W); also stops where a side scan would
+        # find a jump point. Only the tile in the goal's row can see the goal
+        # from the side, so that is the one tile checked at query time.
+        stop = south[p] if d == W else north[p]
+        last = stop if stop >= 0 else ~stop - d
+        c = pg - pg % W + p % W
+        if c != stop and (c - p) * d >= 0 and (last - c) * d >= 0:
+            if c == pg or jump_x(c + 1, 1) == pg or jump_x(c - 1, -1) == pg:
+                return c
+        return stop if stop >= 0 else None
+
+    if start == goal:
+        return [start] if free[pg] else []
+    sx, sy = start
+    ps = (sy + 1) * W + sx + 1
+    dist = {ps: 0}
+    parent = {ps: -1}
+    closed = set()
+    heap = [(abs(sx - gx) + abs(sy - gy), 0, sx, sy, ps)]
+    expanded, pushes = 0, 1
+    found = False
+    while heap:
+        f, cost, x, y, p = heapq.heappop(heap)
+        if p in closed:
+            continue
+        closed.add(p)
+        expanded += 1
+        if p == pg:
+            found = True
+            break
+        # Pruned directions: straight on plus both sides for a node reached
+        # by a scan, all four from the start
+        q = parent[p]
+        if q < 0:
+            steps = (1, -1, W, -W)
+        elif abs(p - q) < W:
+            d = 1 if p > q else -1
+            steps = (d, W, -W)
+        else:
+            d = W if p > q else -W
+            steps = (d, 1, -1)
+        for d in steps:
+            if not free[p + d]:
+                continue
+            j = jump_x(p + d, d) if d == 1 or d == -1 else jump_y(p + d, d)
+            if j is None or j in closed:
+                continue
+            jx, jy = j % W - 1, j // W - 1
+            new_cost = cost + abs(jx - x) + abs(jy - y)
+            if new_cost < dist.get(j, new_cost + 1):
+                dist[j] = new_cost
+                parent[j] = p
+                pushes += 1
+                heapq.heappush(heap, (new_cost + abs(jx - gx) + abs(jy - gy), new_cost, jx, jy, j))
+    if stats is not None:
+        stats["expanded"] += expanded
+        stats["pushes"] += pushes
+    if not found:
+        return []
+
+    # Fill in the straight runs between consecutive jump points
+    path = []
+    p = pg
+    while parent[p] >= 0:
+        q = parent[p]
+        d = 1 if abs(p - q) < W else W
+        d = d if q > p else -d
+        while p != q:
+            path.append((p % W - 1, p // W - 1))
+            p += d
+    path.append(start)
+    path.reverse()
+    return path
+
+def jps_next_direction(ghost, pacman, maze, table=None, stats=None):
+    if table is not None:
+        return table.next_direction(ghost, pacman)  # Precomputed next hop
+    path = jps_path((ghost.x, ghost.y), (pacman.x, pacman.y), maze, stats)
+    if len(path) < 2:
+        return ghost.dir  # No path found or already at Pac-Man
+    return (path[1][0] - path[0][0], path[1][1] - path[0][1])
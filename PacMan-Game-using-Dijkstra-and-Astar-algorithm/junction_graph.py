@@ -0,0 +1,172 @@
+import heapq
+from grid import as_grid
+
+DIRECTIONS = [(1,0), (-1,0), (0,1), (0,-1)]
+
+class JunctionGraph:
+    # The maze contracted to a weighted graph: nodes are junctions and dead
+    # ends (walkable tiles without exactly two walkable neighbours), edges are
+    # the corridors between them weighted by their length. Searches run on
+    # this graph and the result is expanded back into tiles, so callers get
+    # the same (x, y) lists as get_path / get_full_path with far fewer heap
+    # operations. Walls must not change after the graph is built.
+    def __init__(self, maze):
+        self.grid = as_grid(maze)
+        self.rows, self.cols = self.grid.rows, self.grid.cols
+        self.nodes = []  # node id -> (x, y)
+        self.node_id = {}  # (x, y) -> node id
+        # node id -> list of (other node, length, edge id, from offset, to offset)
+        self.adj = []
+        # edge id -> tiles from node a to node b inclusive; offset i is line[i]
+        self.lines = []
+        self.corridor = {}  # corridor tile -> (edge id, offset)
+        self._traced = set()  # (node tile, first step) pairs already walked
+        for i in self.grid.junctions():
+            self._add_node(self.grid.xy(i))
+        self._trace_all()
+        # Loops made only of corridor tiles have no junction; promote one tile
+        # per loop to a node so every walkable tile is covered
+        for y in range(self.rows):
+            for x in range(self.cols):
+                if self._walkable(x, y) and (x, y) not in self.node_id and (x, y) not in self.corridor:
+                    self._add_node((x, y))
+                    self._trace_all()
+
+    def _walkable(self, x, y):
+        return self.grid.is_walkable(x, y)
+
+    def _neighbours(self, x, y):
+        grid = self.grid
+        return [grid.xy(n) for n in grid.neighbours[grid.index(x, y)]]
+
+    def _add_node(self, tile):
+        self.node_id[tile] = len(self.nodes)
+        self.nodes.append(tile)
+        self.adj.append([])
+
+    def _trace_all(self):
+        # Walks every corridor leaving a node until it reaches the next node
+        for a, tile in enumerate(self.nodes):
+            for first in self._neighbours(*tile):
+                if (tile, first) in self._traced:
+                    continue
+                line = [tile]
+                prev, cur = tile, first
+                while cur not in self.node_id:
+                    line.append(cur)
+                    prev, cur = cur, next(n for n in self._neighbours(*cur) if n != prev)
+                line.append(cur)
+                b = self.node_id[cur]
+                self._traced.add((tile, first))
+                self._traced.add((cur, line[-2]))
+                e = len(self.lines)
+                self.lines.append(line)
+                end = len(line) - 1
+                for offset in range(1, end):
+                    self.corridor[line[offset]] = (e, offset)
+                self.adj[a].append((b, end, e, 0, end))
+                if b != a:
+                    self.adj[b].append((a, end, e, end, 0))
+
+    def _links(self, tile, leaving):
+        # How a tile joins the graph: (node, cost, edge, from offset, to
+        # offset) hops leaving the tile for its nodes, or arriving at it
+        if tile in self.node_id:
+            return [(self.node_id[tile], 0, None, 0, 0)]
+        if tile not in self.corridor:
+            return []
+        e, k = self.corridor[tile]
+        line = self.lines[e]
+        end = len(line) - 1
+        a, b = self.node_id[line[0]], self.node_id[line[-1]]
+        if leaving:
+            return [(a, k, e, k, 0), (b, end - k, e, k, end)]
+        return [(a, k, e, 0, k), (b, end - k, e, end, k)]
+
+    def path(self, start, goal, algorithm="dijkstra", stats=None):
+        # Returns a list of (x, y) positions from start to goal (including
+        # both), or [] if there is no path
+        if start == goal:
+            return [start] if self._walkable(*start) else []
+        if not self._walkable(*start):
+            # Pac-Man spawns inside a wall; like the grid searches, step out
+            # through whichever open neighbour gives the shortest path
+            paths = [self.path(n, goal, algorithm, stats) for n in self._neighbours(*start)]
+            paths = [p for p in paths if p]
+            return [start] + min(paths, key=len) if paths else []
+        starts, goals = self._links(start, True), self._links(goal, False)
+        if not starts or not goals:
+            return []
+        n = len(self.nodes)
+        source, target = n, n + 1  # Virtual nodes for the start and goal tiles
+        gx, gy = goal
+
+        def heuristic(node):
+            if algorithm == "dijkstra" or node == target:  # A* and JPS both get the heuristic
+                return 0
+            x, y = start if node == source else self.nodes[node]
+            return abs(x - gx) + abs(y - gy)
+
+        into_goal = {}  # node -> cheapest hop from it to the goal tile
+        for node, cost, e, from_k, to_k in goals:
+            if node not in into_goal or cost < into_goal[node][1]:
+                into_goal[node] = (target, cost, e, from_k, to_k)
+        dist = [float('inf')] * (n + 2)
+        prev = [None] * (n + 2)  # node -> (previous node, edge, from offset, to offset)
+        dist[source] = 0
+        heap = [(heuristic(source), 0, source)]
+        expanded, pushes = 0, 1
+        while heap:
+            f, cost, u = heapq.heappop(heap)
+            if cost > dist[u]:
+                continue  # Stale heap entry
+            expanded += 1
+            if u == target:
+                break
+            if u == source:
+                hops = list(starts)
+                # Start and goal on the same corridor: walk straight along it
+                se, sk = self.corridor.get(start, (None, 0))
+                ge, gk = self.corridor.get(goal, (None, 0))
+                if se is not None and se == ge:
+                    hops.append((target, abs(sk - gk), se, sk, gk))
+            else:
+                hops = self.adj[u]
+                if u in into_goal:
+                    hops = hops + [into_goal[u]]
+            for v, length, e, from_k, to_k in hops:
+                new_cost = cost + length
+                if new_cost < dist[v]:
+                    dist[v] = new_cost
+                    prev[v] = (u, e, from_k, to_k)
+                    pushes += 1
+                    heapq.heappush(heap, (new_cost + heuristic(v), new_cost, v))
+        if stats is not None:
+            stats["expanded"] += expanded
+            stats["pushes"] += pushes
+        if prev[target] is None:
+            return []
+
+        # Expand the hops back into tiles
+        hops = []
+        v = target
+        while v != source:
+            u, e, from_k, to_k = prev[v]
+            hops.append((e, from_k, to_k))
+            v = u
+        path = [start]
+        for e, from_k, to_k in reversed(hops):
+            if e is None:
+                continue  # Start or goal tile is itself a node
+            line = self.lines[e]
+            if to_k >= from_k:
+                path.extend(line[from_k + 1:to_k + 1])
+            else:
+                path.extend(line[to_k:from_k][::-1])
+        return path
+
+    def next_direction(self, ghost, pacman, algorithm="dijkstra", stats=None):
+        path = self.path((ghost.x, ghost.y), (pacman.x, pacman.y), algorithm, stats)
+        if len(path) < 2:
+            return ghost.dir  # No path found or already at Pac-Man
+        return (path[1][0] - path[0][0], path[1][1] - path[0][1])
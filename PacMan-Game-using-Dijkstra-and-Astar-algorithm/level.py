@@ -0,0 +1,182 @@
+import hashlib
+import marshal
+import struct
+import sys
+import zlib
+from array import array
+from grid import Grid
+
+# Level files: a maze of any size plus where Pac-Man and the ghosts start
+# and where eaten ghosts respawn. The text form (.lvl) is meant for editing:
+#
+#   # comment
+#   name classic
+#   pacman 7 10
+#   ghost 6 5              one line per ghost, any number of them
+#   house 7 8
+#   door_period 300        optional, ticks at FPS between door changes
+#   maze
+#   111111111111111111     one digit per tile, as in the MAZE legend
+#   ...
+#
+# The compiled form (.lvlc, written by `python level.py SRC [DEST]`) stores
+# the tiles with the pellet and junction indices and the neighbour lists,
+# zlib-compressed. Building a million neighbour tuples is most of the cost of
+# loading a large level, and marshal restores them several times faster;
+# marshal's format belongs to the Python version, so a file written by
+# another one still loads, just with the lists rebuilt.
+# Either way load() returns a Level whose grid has its derived indices
+# (walkable mask, neighbour lists, pellet set, junction list) built and
+# cached, and GameState copies share them.
+
+MAGIC = b"PMLV"
+VERSION = 1
+HEADER = struct.Struct("<4sBBIIIIIIIi")  # magic, version, marshal version, rows, cols, pacman x/y, house x/y, ghosts, door_period
+
+class Level:
+    def __init__(self, name, grid, pacman_start, ghost_starts, ghost_house, door_period=None):
+        self.name = name
+        self.grid = grid
+        self.pacman_start = tuple(pacman_start)
+        self.ghost_starts = [tuple(start) for start in ghost_starts]
+        self.ghost_house = tuple(ghost_house)
+        self.door_period = door_period  # None: the game's default
+
+    def prepare(self):
+        # Builds the indices that are cached on the grid rather than made
+        # by its constructor
+        self.grid.padded_walkable()
+        self.grid.junctions()
+        return self
+
+    def digest(self):
+        # 8-byte hash of the tiles and spawns, e.g. to tie a replay to its level
+        grid = self.grid
+        h = hashlib.blake2b(struct.pack("<HH", grid.rows, grid.cols) + bytes(grid.cells), digest_size=8)
+        for x, y in [self.pacman_start, self.ghost_house] + self.ghost_starts:
+            h.update(struct.pack("<ii", x, y))
+        return h.digest()
+
+    def to_text(self):
+        lines = [f"name {self.name}", "pacman %d %d" % self.pacman_start]
+        lines += ["ghost %d %d" % start for start in self.ghost_starts]
+        lines.append("house %d %d" % self.ghost_house)
+        if self.door_period is not None:
+            lines.append(f"door_period {self.door_period}")
+        lines.append("maze")
+        cells, cols = self.grid.cells, self.grid.cols
+        lines += [cells[y * cols:(y + 1) * cols].translate(DIGITS).decode() for y in range(self.grid.rows)]
+        return "\n".join(lines) + "\n"
+
+    def to_bytes(self):
+        grid = self.grid
+        pellets = array("I", sorted(grid.pellet_cells))
+        junctions = array("I", grid.junctions())
+        out = bytearray(HEADER.pack(MAGIC, VERSION, marshal.version, grid.rows, grid.cols, *self.pacman_start, *self.ghost_house,
+                                    len(self.ghost_starts), -1 if self.door_period is None else self.door_period))
+        out += array("I", [v for start in self.ghost_starts for v in start]).tobytes()
+        name = self.name.encode()
+        out += struct.pack("<I", len(name)) + name
+        for block in (bytes(grid.cells), pellets.tobytes(), junctions.tobytes(), marshal.dumps(grid.neighbours)):
+            block = zlib.compress(block, 1)
+            out += struct.pack("<I", len(block)) + block
+        return bytes(out)
+
+# Tile value <-> digit, for bytes.translate
+DIGITS = bytes(range(48, 48 + 10)) + bytes(246)
+TILES = bytes(48) + bytes(range(10)) + bytes(198)
+
+def _check(level, where):
+    grid = level.grid
+    for what, (x, y) in [("pacman", level.pacman_start), ("house", level.ghost_house)] + [("ghost", s) for s in level.ghost_starts]:
+        if not grid.in_bounds(x, y):
+            raise ValueError(f"{where}: {what} start ({x}, {y}) is outside the {grid.cols}x{grid.rows} maze")
+    if not level.ghost_starts:
+        raise ValueError(f"{where}: no ghost starts")
+    return level
+
+def parse(text, where="<level>"):
+    # Builds a Level from the text form; errors name the line they are on
+    name, pacman, house, door_period, ghosts, rows = None, None, None, None, [], []
+    lines = text.splitlines()
+    for number, line in enumerate(lines, 1):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        key, _, value = line.partition(" ")
+        try:
+            if key == "name":
+                name = value.strip()
+            elif key in ("pacman", "ghost", "house"):
+                x, y = (int(v) for v in value.split())
+                if key == "pacman":
+                    pacman = (x, y)
+                elif key == "house":
+                    house = (x, y)
+                else:
+                    ghosts.append((x, y))
+            elif key == "door_period":
+                door_period = int(value)
+            elif key == "maze":
+                rows = [row.strip() for row in lines[number:] if row.strip()]
+                break
+            else:
+                raise ValueError(f"unknown key {key!r}")
+        except ValueError as e:
+            raise ValueError(f"{where}:{number}: {e}") from None
+    if not rows:
+        raise ValueError(f"{where}: no maze")
+    if pacman is None or house is None:
+        raise ValueError(f"{where}: needs both a pacman and a house line")
+    cols = len(rows[0])
+    for y, row in enumerate(rows):
+        if len(row) != cols or not row.isdigit() or max(row) > "5":
+            raise ValueError(f"{where}: maze row {y} must be {cols} digits 0-5")
+    cells = "".join(rows).encode().translate(TILES)
+    grid = Grid(len(rows), cols, cells)
+    return _check(Level(name or "untitled", grid, pacman, ghosts, house, door_period), where)
+
+def from_bytes(data, where="<level>"):
+    magic, version, marshal_version, rows, cols, px, py, hx, hy, ghost_count, door_period = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{where}: not a compiled level (or an unsupported version)")
+    pos = HEADER.size
+    starts = array("I", data[pos:pos + 8 * ghost_count])
+    pos += 8 * ghost_count
+    (length,) = struct.unpack_from("<I", data, pos)
+    name = data[pos + 4:pos + 4 + length].decode()
+    pos += 4 + length
+    blocks = []
+    for _ in range(4):
+        (length,) = struct.unpack_from("<I", data, pos)
+        blocks.append(zlib.decompress(data[pos + 4:pos + 4 + length]))
+        pos += 4 + length
+    cells, pellets, junctions = blocks[0], array("I", blocks[1]), array("I", blocks[2])
+    neighbours = marshal.loads(blocks[3]) if marshal_version == marshal.version else None
+    grid = Grid(rows, cols, cells, pellet_cells=pellets, neighbours=neighbours)
+    grid.derived("junctions", lambda grid: list(junctions))
+    ghosts = [(starts[k], starts[k + 1]) for k in range(0, len(starts), 2)]
+    return _check(Level(name, grid, (px, py), ghosts, (hx, hy), None if door_period < 0 else door_period), where)
+
+def load(path):
+    # Reads a .lvl or .lvlc file into a prepared Level
+    with open(path, "rb") as f:
+        data = f.read()
+    level = from_bytes(data, path) if data[:4] == MAGIC else parse(data.decode(), path)
+    return level.prepare()
+
+def save(level, path):
+    # Writes the compiled form for a .lvlc path, else the text form
+    if path.endswith(".lvlc"):
+        with open(path, "wb") as f:
+            f.write(level.to_bytes())
+    else:
+        with open(path, "w") as f:
+            f.write(level.to_text())
+
+if __name__ == "__main__":
+    # python level.py SRC [DEST]: compiles (or decompiles) a level
+    src = sys.argv[1]
+    dest = sys.argv[2] if len(sys.argv) > 2 else src.rsplit(".", 1)[0] + ".lvlc"
+    save(load(src), dest)
+    print(f"{src} -> {dest}")
@@ -0,0 +1,196 @@
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import deque
+from grid import OBSTACLE, WALL, as_grid
+
+DIRECTIONS = [(1,0), (-1,0), (0,1), (0,-1)]
+NO_HOP = 255
+UNREACHABLE = 0xFFFF
+
+# Binary layout: header, walkable cell indices (uint32), then an n*n distance
+# matrix (uint16) and an n*n next-hop matrix (uint8, index into DIRECTIONS).
+# Row = start tile, column = goal tile.
+MAGIC = b"PMNH"
+VERSION = 1
+HEADER = struct.Struct("<4sHBxHHI")  # magic, version, little-endian flag, rows, cols, n
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+def wall_hash(maze):
+    # Only walls and closed doors matter for walkability; pellets and fruit
+    # can change freely
+    grid = as_grid(maze)
+    h = hashlib.sha1(struct.pack("<HH", grid.rows, grid.cols))
+    h.update(bytes(1 if tile == WALL or tile == OBSTACLE else 0 for tile in grid.cells))
+    return h.hexdigest()
+
+class NextHopTable:
+    # All-pairs shortest-path table over the walkable tiles of a fixed wall
+    # layout. Every query is a lookup, so ghosts and the autopilot do no search
+    # at all in the frame loop. Memory is O(walkable tiles ** 2).
+    def __init__(self, rows, cols, cells, dist, hops, mapping=None):
+        self.rows, self.cols = rows, cols
+        self.cells = cells  # walkable id -> flat tile index
+        self.dist = dist
+        self.hops = hops
+        self.n = len(cells)
+        self._mapping = mapping  # keeps the mmap alive when loaded from disk
+        self.ids = [-1] * (rows * cols)  # flat tile index -> walkable id
+        for i, cell in enumerate(cells):
+            self.ids[cell] = i
+
+    @classmethod
+    def build(cls, maze):
+        grid = as_grid(maze)
+        ROWS, COLS, neighbours = grid.rows, grid.cols, grid.neighbours
+        cells = array("I", (i for i, tile in enumerate(grid.cells) if tile != WALL and tile != OBSTACLE))
+        n = len(cells)
+        if n >= UNREACHABLE:
+            raise ValueError("maze has too many walkable tiles for a next-hop table")
+        ids = [-1] * grid.size
+        for i, cell in enumerate(cells):
+            ids[cell] = i
+        dist = array("H", [UNREACHABLE]) * (n * n)
+        hops = array("B", [NO_HOP]) * (n * n)
+        # Neighbour offsets in DIRECTIONS order, to recover the hop index
+        offsets = {dy * COLS + dx: k for k, (dx, dy) in enumerate(DIRECTIONS)}
+        # One reverse BFS per goal fills a column of both matrices
+        for goal, cell in enumerate(cells):
+            column = [-1] * grid.size
+            column[cell] = 0
+            dist[goal * n + goal] = 0
+            queue = deque([cell])
+            while queue:
+                i = queue.popleft()
+                d = column[i] + 1
+                for ncell in neighbours[i]:
+                    if column[ncell] < 0:
+                        column[ncell] = d
+                        dist[ids[ncell] * n + goal] = d
+                        queue.append(ncell)
+            for start, scell in enumerate(cells):
+                d = dist[start * n + goal]
+                if d == 0 or d == UNREACHABLE:
+                    continue
+                for ncell in neighbours[scell]:
+                    if column[ncell] == d - 1:
+                        hops[start * n + goal] = offsets[ncell - scell]
+                        break
+        return cls(ROWS, COLS, cells, dist, hops)
+
+    def save(self, path):
+        # Written to a temporary file first so a crash never leaves a torn cache
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, sys.byteorder == "little", self.rows, self.cols, self.n))
+            f.write(array("I", self.cells).tobytes())
+            f.write(array("H", self.dist).tobytes())
+            f.write(array("B", self.hops).tobytes())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        # Memory-maps the file; returns None if it is missing or unusable
+        try:
+            with open(path, "rb") as f:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if len(mapping) < HEADER.size:
+            return None
+        magic, version, little, rows, cols, n = HEADER.unpack_from(mapping)
+        if magic != MAGIC or version != VERSION or little != (sys.byteorder == "little"):
+            return None
+        if len(mapping) != HEADER.size + n * 4 + n * n * 3:
+            return None
+        view = memoryview(mapping)
+        offset = HEADER.size
+        cells = view[offset:offset + n * 4].cast("I")
+        offset += n * 4
+        dist = view[offset:offset + n * n * 2].cast("H")
+        offset += n * n * 2
+        hops = view[offset:offset + n * n]
+        return cls(rows, cols, cells, dist, hops, mapping)
+
+    def _pair(self, start, goal):
+        # Flat matrix offset for a (start, goal) pair, or -1 if either is a wall
+        sx, sy = start
+        gx, gy = goal
+        if not (0 <= sx < self.cols and 0 <= sy < self.rows and 0 <= gx < self.cols and 0 <= gy < self.rows):
+            return -1
+        s, g = self.ids[sy * self.cols + sx], self.ids[gy * self.cols + gx]
+        if s < 0 or g < 0:
+            return -1
+        return s * self.n + g
+
+    def _exit(self, start, goal):
+        # (distance, direction) through the walkable neighbour of a wall
+        # start (a ghost respawning inside the ghost house) closest to goal,
+        # or None; the grid searches step out of walls the same way
+        x, y = start
+        if not (0 <= x < self.cols and 0 <= y < self.rows) or self.ids[y * self.cols + x] >= 0:
+            return None
+        best = None
+        for dx, dy in DIRECTIONS:
+            i = self._pair((x + dx, y + dy), goal)
+            if i >= 0 and self.dist[i] != UNREACHABLE and (best is None or self.dist[i] + 1 < best[0]):
+                best = (self.dist[i] + 1, (dx, dy))
+        return best
+
+    def distance(self, start, goal):
+        i = self._pair(start, goal)
+        if i < 0:
+            exit = self._exit(start, goal)
+            return exit[0] if exit else -1
+        if self.dist[i] == UNREACHABLE:
+            return -1
+        return self.dist[i]
+
+    def first_step(self, start, goal):
+        i = self._pair(start, goal)
+        if i < 0:
+            exit = self._exit(start, goal)
+            return exit[1] if exit else None
+        if self.hops[i] == NO_HOP:
+            return None
+        return DIRECTIONS[self.hops[i]]
+
+    def next_direction(self, ghost, pacman):
+        step = self.first_step((ghost.x, ghost.y), (pacman.x, pacman.y))
+        if step is None:
+            return ghost.dir  # No path found or already at Pac-Man
+        return step
+
+    def path(self, start, goal):
+        # Returns a list of (x, y) positions from start to goal (including both),
+        # or [] if there is no path
+        if self.distance(start, goal) < 0:
+            return []
+        x, y = start
+        path = [(x, y)]
+        step = self.first_step((x, y), goal)
+        while step is not None:
+            x, y = x + step[0], y + step[1]
+            path.append((x, y))
+            step = self.first_step((x, y), goal)
+        return path
+
+def load_or_build(maze, cache_dir=CACHE_DIR):
+    # Looks up the table for this wall layout in the cache, building and
+    # saving it on the first run
+    grid = as_grid(maze)
+    path = os.path.join(cache_dir, f"nexthop-{wall_hash(grid)[:16]}.bin")
+    table = NextHopTable.load(path)
+    if table is not None and (table.rows, table.cols) == (grid.rows, grid.cols):
+        return table
+    table = NextHopTable.build(grid)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        table.save(path)
+    except OSError:
+        pass  # Read-only install: keep the in-memory table
+    return table
@@ -0,0 +1,63 @@
+from collections import deque
+
+MAX_EXTENSIONS = 1  # One-tile target moves patched onto a path before a fresh search; each can add two steps
+
+class PathCache:
+    # Per-ghost cache of the last planned path to Pac-Man. A ghost walks its
+    # cached path while Pac-Man stays on the tile it was planned for; when he
+    # has moved by a single tile, the path is patched instead of searched
+    # again: his old tile is dropped when he steps back along it, otherwise
+    # his new tile is appended, up to MAX_EXTENSIONS times in a row. Appended
+    # paths stay walkable, but each append can leave the path two steps
+    # longer than a fresh search (he may have stepped towards the ghost), so
+    # with the default of one a cached path is at most two steps too long.
+    def __init__(self, max_extensions=MAX_EXTENSIONS):
+        self.max_extensions = max_extensions
+        self.entries = {}  # ghost -> [path deque starting at the ghost, tiles appended so far]
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        # Drops every cached path (walls changed, level restarted)
+        self.entries.clear()
+
+    def _reuse(self, entry, here, target):
+        path = entry[0]
+        if len(path) > 1 and path[0] != here and path[1] == here:
+            path.popleft()  # The ghost took the step it was given
+        if path[0] != here:
+            return False  # Moved some other way (eaten, reset after a death)
+        end = path[-1]
+        if end == target:
+            return True
+        if len(path) > 1 and path[-2] == target:
+            path.pop()  # Pac-Man stepped back towards the ghost; still shortest
+            return True
+        if entry[1] >= self.max_extensions or abs(end[0] - target[0]) + abs(end[1] - target[1]) != 1:
+            return False
+        path.append(target)
+        entry[1] += 1
+        return True
+
+    def path(self, ghost, target, plan):
+        # Path from the ghost's tile to target (both included), from the
+        # cache when possible, else from plan(start, goal), which returns a
+        # list of tiles or an empty list when there is no path
+        here = (ghost.x, ghost.y)
+        entry = self.entries.get(ghost)
+        if entry is not None and self._reuse(entry, here, target):
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        path = plan(here, target)
+        if not path:
+            self.entries.pop(ghost, None)
+            return path
+        entry = self.entries[ghost] = [deque(path), 0]
+        return entry[0]
+
+    def next_direction(self, ghost, target, plan):
+        path = self.path(ghost, target, plan)
+        if len(path) < 2:
+            return ghost.dir  # No path found or already at Pac-Man
+        return (path[1][0] - path[0][0], path[1][1] - path[0][1])
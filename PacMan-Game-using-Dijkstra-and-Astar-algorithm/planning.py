@@ -0,0 +1,130 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from autopilot import bfs_path
+from game import get_path
+
+# Pathfinding off the main thread. A PlanningWorker runs ghost and Auto-Pilot
+# searches in separate processes, so a slow search on a big level costs their
+# time instead of frames. Auto-Pilot routes are quick and get a process of
+# their own, so they never queue behind a ghost's search across the level;
+# the ghosts share the others. Each process keeps its own copy of the maze:
+# GameState reports every tile it changes (pellets eaten, doors moved) and the
+# changes are sent ahead of the process's next request, so each search sees
+# the maze as it was when it was asked for, or newer.
+#
+# Requests are keyed by who asked (a ghost, the Auto-Pilot). Each key has at
+# most one request in flight; newer ones wait behind it, and only the newest
+# waiting one is sent when it finishes, so a worker that falls behind skips
+# stale requests rather than queueing them. The game never waits for a
+# result: it steers by the newest one that has arrived, which may be a few
+# ticks old.
+#
+# Results depend on how fast the worker runs, so games planned this way
+# can't be recorded or replayed.
+
+PROCESSES = 2
+
+class PlanningWorker:
+    def __init__(self, grid, processes=PROCESSES):
+        self.pools = [ProcessPoolExecutor(max_workers=1, initializer=_start, initargs=(grid.copy(),))
+                      for _ in range(processes)]
+        self.changes = [[] for _ in range(processes)]  # Per process: (x, y, tile) not yet sent
+        self.lanes = {}  # key -> index of the process its requests go to
+        self.running = {}  # key -> (request, future)
+        self.waiting = {}  # key -> newest request behind the running one
+        self.results = {}  # key -> (request, result) of the newest finished request
+        self.dropped = 0  # Requests replaced by a newer one before they were sent
+        self.seconds = 0.0  # Time the processes spent searching
+
+    def tile_changed(self, x, y, tile):
+        for changes in self.changes:
+            changes.append((x, y, tile))
+
+    def _lane(self, key, request):
+        # Auto-Pilot requests go to the first process, ghosts take turns at
+        # the others (all share one when there is only one)
+        if key not in self.lanes:
+            others = len(self.pools) - 1
+            self.lanes[key] = 0 if request[0] == "pellet" or not others else 1 + len(self.lanes) % others
+        return self.lanes[key]
+
+    def _send(self, key, request):
+        # A process works through its queue in order, so the changes reach
+        # its maze before the request is run
+        lane = self._lane(key, request)
+        pool = self.pools[lane]
+        if self.changes[lane]:
+            pool.submit(_apply, self.changes[lane])
+            self.changes[lane] = []
+        self.running[key] = (request, pool.submit(_run, request))
+
+    def poll(self):
+        # Collects finished requests and sends the next waiting one per key
+        for key, (request, future) in list(self.running.items()):
+            if future.done():
+                del self.running[key]
+                result, seconds = future.result()
+                self.results[key] = (request, result)
+                self.seconds += seconds
+                if key in self.waiting:
+                    self._send(key, self.waiting.pop(key))
+
+    def submit(self, key, request):
+        # Asks for ("path", start, goal, algorithm, ...) or ("pellet", start)
+        # for key, unless that is already being (or was last) worked out.
+        # Anything after the request's algorithm only tells requests apart.
+        self.poll()
+        if key in self.running:
+            waiting = self.waiting.get(key)
+            if waiting is not None and waiting != request:
+                self.dropped += 1
+            if self.running[key][0] == request:
+                self.waiting.pop(key, None)
+            else:
+                self.waiting[key] = request
+        elif key not in self.results or self.results[key][0] != request:
+            self._send(key, request)
+
+    def latest(self, key):
+        # Newest result for key, or None; it stays until a newer one arrives
+        self.poll()
+        return self.results[key][1] if key in self.results else None
+
+    def take(self, key):
+        # Like latest(), but the result is used up
+        self.poll()
+        return self.results.pop(key, (None, None))[1]
+
+    def close(self):
+        for pool in self.pools:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+# --- Worker process ---
+
+_grid = None  # The worker's copy of the maze
+
+def _start(grid):
+    global _grid
+    _grid = grid
+
+def _apply(changes):
+    _grid.set_many(changes)
+
+def _run(request):
+    # "path": {tile: next tile} along a path from start to goal, {} if there
+    # is none. "pellet": flat indices of the route to the nearest pellet,
+    # start excluded, or None; a pellet on the start counts as eaten, so a
+    # route can be asked for from the tile Pac-Man is about to eat.
+    start = time.perf_counter()
+    if request[0] == "path":
+        path = get_path(request[1], request[2], _grid, request[3])
+        result = dict(zip(path, path[1:]))
+    else:
+        here = _grid.index(*request[1])
+        pellets = _grid.pellet_cells
+        eaten = here in pellets
+        pellets.discard(here)
+        result = bfs_path(_grid, here, pellets)
+        if eaten:
+            pellets.add(here)
+    return result, time.perf_counter() - start
@@ -0,0 +1,116 @@
+import json
+import time
+from collections import deque
+
+# Frame profiler for the game loop. main.py marks the phases of each frame
+# (events, simulate, render, flip) with lap(), GameState wraps the Auto-Pilot
+# and each ghost's steering in push()/pop() spans, and every pathfinding
+# call made through GameState._search is recorded with its cost. Nothing is
+# profiled unless a Profiler is attached (state.profiler, renderer.profiler),
+# and the hooks are skipped entirely when it isn't.
+#
+# The last `window` frames feed the on-screen overlay; with record=True every
+# event is also kept for save(), which writes a Chrome trace (load it in
+# chrome://tracing or Perfetto) or, for a .jsonl path, one JSON object per
+# event.
+
+WINDOW = 60  # Frames averaged for the overlay, which refreshes once per window
+
+class Profiler:
+    def __init__(self, record=False, window=WINDOW, clock=time.perf_counter):
+        self.clock = clock
+        self.window = window
+        self.frames = deque(maxlen=window)  # Finished frames: {name: seconds}, plus search totals
+        self.events = [] if record else None  # (frame, name, category, start, end, args)
+        self.frame = 0
+        self.origin = clock()
+        self.current = None  # Frame being measured: {name: seconds}, plus search totals
+        self.start = self.last = 0.0
+        self.stack = []  # Open spans: (name, start)
+        self._summary = []
+
+    def _record(self, name, category, start, end, args=None):
+        if self.events is not None:
+            self.events.append((self.frame, name, category, start, end, args))
+
+    def begin_frame(self):
+        self.current = {"searches": 0, "expanded": 0, "pushes": 0}
+        self.stack = []
+        self.start = self.last = self.clock()
+
+    def lap(self, name):
+        # Charges the time since the last lap (or the frame start) to name
+        now = self.clock()
+        current = self.current
+        current[name] = current.get(name, 0.0) + now - self.last
+        self._record(name, "frame", self.last, now)
+        self.last = now
+
+    def push(self, name):
+        self.stack.append((name, self.clock()))
+
+    def pop(self, **args):
+        name, start = self.stack.pop()
+        now = self.clock()
+        if self.current is not None:
+            self.current[name] = self.current.get(name, 0.0) + now - start
+        self._record(name, "span", start, now, args or None)
+
+    def search(self, name, start, end, cost, result):
+        # One pathfinding call: its cost dict (expanded, pushes) and, when it
+        # returned a path, that path's length in steps
+        if self.current is not None:
+            current = self.current
+            current["searches"] += 1
+            current["expanded"] += cost["expanded"]
+            current["pushes"] += cost["pushes"]
+        if self.events is not None:
+            args = dict(cost)
+            if isinstance(result, (list, deque)):
+                args["path_length"] = max(len(result) - 1, 0)
+            self._record(name, "search", start, end, args)
+
+    def end_frame(self):
+        current = self.current
+        current["frame"] = self.clock() - self.start
+        self._record("frame", "frame", self.start, self.start + current["frame"])
+        self.frames.append(current)
+        self.current = None
+        self.frame += 1
+        if self.frame % self.window == 0:
+            self._summary = self._summarize()
+
+    def _summarize(self):
+        # Mean per frame over the window: times in ms, search counts as is
+        totals = {}
+        for frame in self.frames:
+            for name, value in frame.items():
+                totals[name] = totals.get(name, 0) + value
+        n = len(self.frames)
+        rows = []
+        for name in sorted(totals, key=lambda name: (name in ("searches", "expanded", "pushes"), name)):
+            value = totals[name] / n
+            rows.append((name, value if name in ("searches", "expanded", "pushes") else value * 1000))
+        return rows
+
+    def summary(self):
+        # [(name, mean per frame)] as of the last full window; times in ms
+        return self._summary
+
+    def save(self, path):
+        us = 1000000
+        with open(path, "w") as f:
+            if path.endswith(".jsonl"):
+                for frame, name, category, start, end, args in self.events:
+                    event = {"frame": frame, "name": name, "cat": category,
+                             "ts_ms": (start - self.origin) * 1000, "dur_ms": (end - start) * 1000}
+                    event.update(args or {})
+                    f.write(json.dumps(event) + "\n")
+                return
+            trace = []
+            for frame, name, category, start, end, args in self.events:
+                event = {"name": name, "cat": category, "ph": "X", "pid": 1, "tid": 1,
+                         "ts": (start - self.origin) * us, "dur": (end - start) * us}
+                event["args"] = dict(args or {}, frame=frame)
+                trace.append(event)
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
@@ -0,0 +1,264 @@
+import pygame
+from grid import OBSTACLE, WALL, as_grid
+from game import BLACK, BLUE, YELLOW, WHITE, RED, PINK, ORANGE, CYAN, GREEN
+
+TILE_SIZE = 32
+MAX_WINDOW = (1280, 800)  # Larger levels get smaller tiles
+PATH_COLORS = [RED, PINK, CYAN, ORANGE]
+ALGORITHM_LABELS = {"jps": "JPS"}  # Others are shown title-cased
+# Debug levels cycled by D: off, ghost paths, ghost paths + profiler overlay
+DEBUG_LEVELS = 3
+DEBUG_PROFILE = 2
+HUD_LINE = 30  # Height of one HUD line at the bottom of the window
+HUD_MARGIN = 10
+# x of the score, lives, algorithm and Auto-Pilot label on a wide enough
+# window; on a narrow one they wrap onto more lines, stacked upwards
+HUD_X = (10, 110, 200, 400)
+LIFE_SPACING = 30
+
+def fit_tile_size(rows, cols):
+    # TILE_SIZE, shrunk until a rows x cols maze fits in MAX_WINDOW
+    return max(2, min(TILE_SIZE, MAX_WINDOW[0] // cols, MAX_WINDOW[1] // rows))
+
+def draw_tile(surface, x, y, tile, tile_size=TILE_SIZE):
+    # Draws one maze tile onto a surface that already holds the background
+    cx, cy = x * tile_size + tile_size // 2, y * tile_size + tile_size // 2
+    if tile == WALL:
+        pygame.draw.rect(surface, BLUE, (x*tile_size, y*tile_size, tile_size, tile_size), border_radius=8)
+    elif tile == 0:
+        pygame.draw.circle(surface, WHITE, (cx, cy), 4)
+    elif tile == 3:
+        pygame.draw.circle(surface, WHITE, (cx, cy), 8)
+    elif tile == OBSTACLE:
+        # Closed door: a bar across the tile
+        pygame.draw.rect(surface, PINK, (x*tile_size, y*tile_size + tile_size//2 - 3, tile_size, 6))
+    elif tile == 4:
+        pygame.draw.circle(surface, RED, (cx, cy), 7)
+        pygame.draw.circle(surface, GREEN, (cx, cy - 6), 3)
+
+def draw_maze(screen, maze, tile_size=TILE_SIZE):
+    grid = as_grid(maze)
+    for i, tile in enumerate(grid.cells):
+        draw_tile(screen, i % grid.cols, i // grid.cols, tile, tile_size)
+
+def draw_entity(screen, entity, tile_size=TILE_SIZE, alpha=None):
+    # Returns the rect that was drawn over. With alpha (see
+    # FixedTimestep.alpha) the entity is drawn between tiles.
+    x, y = (entity.x, entity.y) if alpha is None else entity.render_pos(alpha)
+    left, top = round(x * tile_size), round(y * tile_size)
+    cx = left + tile_size // 2
+    cy = top + tile_size // 2
+    r = max(1, tile_size // 2 - 2)
+    rect = pygame.Rect(left, top, tile_size, tile_size)
+    if entity.is_pacman:
+        # Determine mouth direction based on movement
+        angle_map = {
+            (1, 0): 0,      # right
+            (0, -1): 90,    # up
+            (-1, 0): 180,   # left
+            (0, 1): 270     # down
+        }
+        angle = angle_map.get(entity.dir, 0)
+        # Draw Pac-Man as an arc (mouth open)
+        pygame.draw.circle(screen, YELLOW, (cx, cy), r)
+        mouth_rect = pygame.Rect(cx - r, cy - r, r * 2, r * 2)
+        pygame.draw.arc(
+            screen, BLACK, mouth_rect,
+            (angle - entity.mouth_angle) * 3.14 / 180,
+            (angle + entity.mouth_angle) * 3.14 / 180,
+            r
+        )
+        # Draw a filled triangle for the mouth
+        mouth_length = r
+        upper = pygame.math.Vector2(1, 0).rotate(-angle + entity.mouth_angle * 180 / 3.14)
+        lower = pygame.math.Vector2(1, 0).rotate(-angle - entity.mouth_angle * 180 / 3.14)
+        pygame.draw.polygon(screen, BLACK, [
+            (cx, cy),
+            (cx + mouth_length * upper.x, cy + mouth_length * upper.y),
+            (cx + mouth_length * lower.x, cy + mouth_length * lower.y),
+        ])
+    else:
+        if entity.respawn_timer > 0:
+            return None  # Don't draw the ghost while respawning
+        color = CYAN if entity.frightened else entity.color
+        pygame.draw.circle(screen, color, (cx, cy), r)
+    return rect
+
+def draw_path(screen, path, color, tile_size=TILE_SIZE):
+    # Draws a colored line following the path (list of (x, y) tuples) and
+    # returns the rect it covers
+    if len(path) < 2:
+        return None
+    points = [(x * tile_size + tile_size // 2, y * tile_size + tile_size // 2) for (x, y) in path]
+    return pygame.draw.lines(screen, color, False, points, 4)
+
+class Renderer:
+    # Draws a GameState with as little work per frame as possible: walls are
+    # pre-rendered once, pellet tiles are repainted only when they change,
+    # and only the rects that changed are sent to the display. Fonts and HUD
+    # text surfaces are cached and re-rendered only when their value changes.
+    def __init__(self, screen, maze, tile_size=TILE_SIZE):
+        self.screen = screen
+        self.tile_size = tile_size
+        self.width, self.height = screen.get_size()
+        self.hud_rect = pygame.Rect(0, self.height - HUD_LINE, self.width, HUD_LINE)
+        self.font = pygame.font.SysFont("Arial", 24)
+        self.big_font = pygame.font.SysFont("Arial", 48)
+        self._texts = {}  # (font, text, color) -> rendered surface
+        # Static wall layer, then the background (walls + pellets) built on it
+        self.walls = pygame.Surface((self.width, self.height))
+        self.walls.fill(BLACK)
+        grid = as_grid(maze)
+        self.cols = grid.cols
+        for i, tile in enumerate(grid.cells):
+            if tile == WALL:
+                draw_tile(self.walls, i % grid.cols, i // grid.cols, tile, tile_size)
+        self.background = self.walls.copy()
+        self.shadow = bytearray(grid.cells)  # Tiles as last painted on the background
+        for i, tile in enumerate(grid.cells):
+            if tile != WALL:
+                draw_tile(self.background, i % grid.cols, i // grid.cols, tile, tile_size)
+        self._overlay = []  # Rects drawn over the background last frame
+        self._hud = None  # HUD values last drawn
+        self._full = True  # Next frame repaints the whole screen
+        self.profiler = None  # Optional profiler.Profiler; render and flip are lapped on it
+        self._small_font = None
+        self._paths = None  # (key, ghost paths) for the debug overlay, see _ghost_paths
+
+    def invalidate(self):
+        self._full = True
+        self._paths = None
+
+    def text(self, text, color, big=False):
+        key = (big, text, color)
+        surface = self._texts.get(key)
+        if surface is None:
+            if len(self._texts) > 256:
+                self._texts.clear()  # Scores only go up; drop stale entries
+            surface = (self.big_font if big else self.font).render(text, True, color)
+            self._texts[key] = surface
+        return surface
+
+    def _sync_tiles(self, maze):
+        # Repaints background tiles that changed since the last frame
+        cells, shadow = maze.cells, self.shadow
+        if cells == shadow:
+            return []  # One compare in C; most frames eat nothing
+        ts, cols = self.tile_size, self.cols
+        dirty = []
+        for i, tile in enumerate(cells):
+            if tile != shadow[i]:
+                x, y = i % cols, i // cols
+                rect = pygame.Rect(x * ts, y * ts, ts, ts)
+                self.background.blit(self.walls, rect, rect)
+                draw_tile(self.background, x, y, tile, ts)
+                shadow[i] = tile
+                dirty.append(rect)
+        return dirty
+
+    def _draw_hud(self, state):
+        # Returns the rect covering both the old and the new HUD
+        algo_name = "Distance Field" if state.distance_field else ALGORITHM_LABELS.get(state.algorithm, state.algorithm.title())
+        texts = [self.text(f"Score: {state.score}", WHITE), None, self.text(f"Algorithm: {algo_name}", WHITE),
+                 self.text("Auto-Pilot ON (A)", CYAN) if state.auto_pilot else None]
+        widths = [texts[0].get_width(), state.lives * LIFE_SPACING - LIFE_SPACING // 3,
+                  texts[2].get_width(), texts[3].get_width() if texts[3] else 0]
+        # Flow the items left to right, starting a new line when one doesn't fit
+        lines, placed, cursor = 0, [], 0
+        for i, width in enumerate(widths):
+            x = max(HUD_X[i] if lines == 0 else HUD_MARGIN, cursor)
+            if cursor and x + width > self.width - HUD_MARGIN:
+                lines, x = lines + 1, HUD_MARGIN
+            placed.append((x, lines))
+            cursor = x + width + HUD_MARGIN
+        height = (lines + 1) * HUD_LINE
+        old, self.hud_rect = self.hud_rect, pygame.Rect(0, self.height - height, self.width, height)
+        area = old.union(self.hud_rect)
+        self.screen.blit(self.background, area, area)
+        for i, (x, line) in enumerate(placed):
+            y = self.hud_rect.top + line * HUD_LINE
+            if i == 1:
+                # Draw remaining lives as Pac-Man icons
+                for life in range(state.lives):
+                    pygame.draw.circle(self.screen, YELLOW, (x + 10 + life * LIFE_SPACING, y + HUD_LINE // 2), 10)
+            elif texts[i] is not None:
+                self.screen.blit(texts[i], (x, y))
+        return area
+
+    def draw(self, state, debug_mode=False, alpha=None):
+        dirty = self._sync_tiles(state.maze)
+        if self._full:
+            self.screen.blit(self.background, (0, 0))
+            dirty = [self.screen.get_rect()]
+        else:
+            # Erase last frame's entities, paths and messages
+            for rect in self._overlay + dirty:
+                self.screen.blit(self.background, rect, rect)
+            dirty += self._overlay
+
+        hud = (state.score, state.algorithm, state.distance_field, state.auto_pilot, state.lives)
+        if self._full or hud != self._hud or self.hud_rect.collidelist(dirty) >= 0:
+            dirty.append(self._draw_hud(state))
+            self._hud = hud
+
+        overlay = [draw_entity(self.screen, state.pacman, self.tile_size, alpha)]
+        for ghost in state.ghosts:
+            overlay.append(draw_entity(self.screen, ghost, self.tile_size, alpha))
+        # Draw ghost paths in debug mode
+        profiler = self.profiler
+        if debug_mode:
+            for idx, path in enumerate(self._ghost_paths(state)):
+                if path:
+                    overlay.append(draw_path(self.screen, path, PATH_COLORS[idx % len(PATH_COLORS)], self.tile_size))
+        if debug_mode >= DEBUG_PROFILE and profiler is not None:
+            overlay.append(self._draw_profile(profiler))
+        self._overlay = [rect for rect in overlay if rect is not None]
+
+        if profiler is not None:
+            profiler.lap("render")
+        if self._full:
+            pygame.display.flip()
+            self._full = False
+        else:
+            pygame.display.update(dirty + self._overlay)
+        if profiler is not None:
+            profiler.lap("flip")
+
+    def _ghost_paths(self, state):
+        # Paths only change when the simulation does, and most frames run
+        # no tick, so they are searched again only for a new tick, door
+        # state or ghost algorithm
+        doors = bytes(state.maze.cells[i] for i in state.doors)
+        key = (state.tick, doors, state.algorithm, state.distance_field)
+        if self._paths is None or self._paths[0] != key:
+            profiler = self.profiler
+            if profiler is not None:
+                profiler.push("debug paths")
+            self._paths = (key, [state.ghost_path(ghost) for ghost in state.ghosts])
+            if profiler is not None:
+                profiler.pop()
+        return self._paths[1]
+
+    def _draw_profile(self, profiler):
+        # Per-frame means from the profiler's last window, top left
+        rows = profiler.summary()
+        if not rows:
+            return None
+        if self._small_font is None:
+            self._small_font = pygame.font.SysFont("Arial", 14)
+        lines = [self._small_font.render(f"{name:<12} {value:9.2f}{'' if name in ('searches', 'expanded', 'pushes') else ' ms'}",
+                                         True, WHITE) for name, value in rows]
+        width = max(line.get_width() for line in lines) + 8
+        panel = pygame.Surface((width, len(lines) * 16 + 6), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 180))
+        for i, line in enumerate(lines):
+            panel.blit(line, (4, 3 + i * 16))
+        return self.screen.blit(panel, (4, 4))
+
+    def message(self, text, color):
+        # Centered banner (PAUSED, YOU WIN!, ...), erased on the next draw
+        surface = self.text(text, color, big=True)
+        rect = self.screen.blit(surface, (self.width // 2 - surface.get_width() // 2, self.height // 2 - 24))
+        if rect not in self._overlay:
+            self._overlay.append(rect)  # Once, however often a paused loop shows it
+        pygame.display.update(rect)
@@ -0,0 +1,268 @@
+import argparse
+import copy
+import hashlib
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from game import ALGORITHMS, CLASSIC, FPS, GameState, as_level
+from level import load as load_level
+
+# Compact binary replays. The simulation is deterministic given its settings
+# and the input of every tick, so a game is stored as just that: a header
+# (seed, maze hash, settings), the per-tick input codes run-length encoded,
+# since they are 0 on almost every tick, and a footer with the outcome and a
+# hash of the final state for checking a replay against a new build.
+#
+# Usage: python replay.py games/*.pmr [--workers N]
+# re-runs replays headless at full speed and reports any that diverge;
+# python main.py --replay FILE --speed 4 plays one back on screen.
+#
+# File layout (little endian):
+#   header  "PMRP", version u8, seed u64, maze hash 8s, algorithm u8,
+#           tick_rate u16, door_period u32, flags u8
+#   runs    (run length varint, input code u8) ..., then a 0 run length
+#   footer  ticks u32, score i32, lives u8, won u8, state hash 8s
+
+MAGIC = b"PMRP"
+VERSION = 2  # 2: the maze hash covers spawns (level.Level.digest)
+HEADER = struct.Struct("<4sBQ8sBHIB")
+FOOTER = struct.Struct("<IiBB8s")
+SNAPSHOT_INTERVAL = FPS * 10  # Ticks between playback snapshots kept for seeking
+
+# An input code is one byte per tick: the low 3 bits pick a direction from
+# ACTIONS (0 = none), the other bits are key toggles applied before the tick
+ACTIONS = [None, (1, 0), (-1, 0), (0, 1), (0, -1)]
+TOGGLE_ALGORITHM = 8  # TAB
+TOGGLE_AUTO_PILOT = 16  # A
+TOGGLE_DISTANCE_FIELD = 32  # F
+
+# GameState options stored in the header flags, by bit
+FLAGS = ["distance_field", "pellet_tour", "incremental", "junction_graph", "path_cache", "danger_field"]
+
+def action_code(action):
+    return ACTIONS.index(action)
+
+def valid_code(code):
+    # Whether code is an input code apply_input understands
+    return code & 7 < len(ACTIONS) and not code & ~(7 | TOGGLE_ALGORITHM | TOGGLE_AUTO_PILOT | TOGGLE_DISTANCE_FIELD)
+
+def apply_input(state, code):
+    # Runs one tick of state with the given input code
+    if code & TOGGLE_ALGORITHM:
+        state.toggle_algorithm()
+    if code & TOGGLE_AUTO_PILOT:
+        state.toggle_auto_pilot()
+    if code & TOGGLE_DISTANCE_FIELD:
+        state.toggle_distance_field()
+    state.step(ACTIONS[code & 7])
+
+def maze_hash(maze):
+    # Hash of the level (tiles and spawns) a replay must be played on
+    return as_level(maze).digest()
+
+def state_hash(state):
+    # Hash of everything that decides how the game goes on from here
+    h = hashlib.blake2b(digest_size=8)
+    h.update(bytes(state.maze.cells))
+    for entity in [state.pacman] + state.ghosts:
+        h.update(struct.pack("<iiiiiiii", entity.x, entity.y, entity.dir[0], entity.dir[1], entity.move_counter,
+                             entity.frightened_timer, entity.respawn_timer, entity.frightened))
+    h.update(struct.pack("<IiBB", state.tick, state.score, state.lives, state.auto_pilot))
+    h.update(state.algorithm.encode())
+    return h.digest()
+
+def _varint(n):
+    out = bytearray()
+    while n >= 0x80:
+        out.append(n & 0x7f | 0x80)
+        n >>= 7
+    out.append(n)
+    return out
+
+def _read_varint(data, pos):
+    n = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        n |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return n, pos
+        shift += 7
+
+class Replay:
+    # A parsed replay: settings, input runs and the recorded outcome
+    def __init__(self, seed, maze_hash, settings, runs, outcome=None):
+        self.seed = seed
+        self.maze_hash = maze_hash
+        self.settings = settings  # GameState keyword arguments
+        self.runs = runs  # [[input code, ticks]]
+        self.outcome = outcome  # (ticks, score, lives, won, state hash) at the end of recording
+
+    @property
+    def ticks(self):
+        return sum(count for code, count in self.runs)
+
+    def codes(self):
+        # The input code of every tick, in order
+        codes = bytearray()
+        for code, count in self.runs:
+            codes += bytes([code]) * count
+        return codes
+
+    def new_state(self, maze=CLASSIC):
+        if maze_hash(maze) != self.maze_hash:
+            raise ValueError("replay was recorded on a different maze")
+        return GameState(as_level(maze), **self.settings)
+
+    def to_bytes(self):
+        s = self.settings
+        flags = sum(1 << bit for bit, name in enumerate(FLAGS) if s.get(name))
+        out = bytearray(HEADER.pack(MAGIC, VERSION, self.seed, self.maze_hash, ALGORITHMS.index(s["algorithm"]),
+                                    s["tick_rate"], s["door_period"], flags))
+        for code, count in self.runs:
+            out += _varint(count)
+            out.append(code)
+        out += _varint(0)
+        if self.outcome is not None:
+            out += FOOTER.pack(*self.outcome)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, seed, digest, algorithm, tick_rate, door_period, flags = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a replay file (or an unsupported version)")
+        settings = {name: bool(flags >> bit & 1) for bit, name in enumerate(FLAGS)}
+        settings.update(algorithm=ALGORITHMS[algorithm], tick_rate=tick_rate, door_period=door_period)
+        runs = []
+        pos = HEADER.size
+        while True:
+            count, pos = _read_varint(data, pos)
+            if count == 0:
+                break
+            runs.append([data[pos], count])
+            pos += 1
+        outcome = FOOTER.unpack_from(data, pos) if len(data) >= pos + FOOTER.size else None
+        return cls(seed, digest, settings, runs, outcome)
+
+def load(path):
+    with open(path, "rb") as f:
+        return Replay.from_bytes(f.read())
+
+class Recorder:
+    # Plays a GameState one tick at a time through apply_input, writing down
+    # each tick's input. Settings are taken from the state, so create the
+    # recorder before its first tick.
+    def __init__(self, state, seed=0):
+        if state.planning is not None:
+            raise ValueError("games planned by a background worker can't be replayed")
+        if state.table is not None:
+            raise ValueError("games steered by a next-hop table can't be replayed")
+        settings = {
+            "algorithm": state.algorithm,
+            "tick_rate": state.tick_rate,
+            # Undo the tick_rate scaling; GameState applies it again
+            "door_period": round(state.door_period * FPS / state.tick_rate),
+            "distance_field": state.distance_field,
+            "pellet_tour": state.pilot.tour,
+            "incremental": state.pilot.incremental,
+            "junction_graph": state.junctions is not None,
+            "path_cache": state.path_cache is not None,
+            "danger_field": state.danger_field,
+        }
+        self.replay = Replay(seed, maze_hash(state.level), settings, [])
+
+    def step(self, state, code=0):
+        apply_input(state, code)
+        runs = self.replay.runs
+        if runs and runs[-1][0] == code:
+            runs[-1][1] += 1
+        else:
+            runs.append([code, 1])
+
+    def save(self, path, state):
+        # Writes the replay with state's outcome as the expected result
+        self.replay.outcome = (state.tick, state.score, state.lives, state.won, state_hash(state))
+        with open(path, "wb") as f:
+            f.write(self.replay.to_bytes())
+
+def snapshot(state):
+    # Deep copy of a game, caches and planners included, minus the profiler.
+    # The level and its neighbour lists never change and stay shared.
+    profiler, state.profiler = state.profiler, None
+    level = state.level
+    try:
+        return copy.deepcopy(state, {id(level): level, id(level.grid.neighbours): level.grid.neighbours})
+    finally:
+        state.profiler = profiler
+
+class Player:
+    # Steps a replay back through a fresh GameState. Every SNAPSHOT_INTERVAL
+    # ticks a snapshot is kept on the way, so seek() can jump back (or ahead,
+    # once played) from the nearest one instead of replaying from the start.
+    def __init__(self, replay, maze=CLASSIC, snapshot_interval=SNAPSHOT_INTERVAL):
+        self.replay = replay
+        self.codes = replay.codes()
+        self.interval = snapshot_interval
+        self.state = replay.new_state(maze)
+        self.snapshots = {0: snapshot(self.state)}  # tick -> snapshot
+
+    @property
+    def done(self):
+        return self.state.tick >= len(self.codes) or not self.state.running
+
+    def step(self):
+        state = self.state
+        apply_input(state, self.codes[state.tick])
+        if state.tick % self.interval == 0 and state.tick not in self.snapshots:
+            self.snapshots[state.tick] = snapshot(state)
+
+    def seek(self, tick):
+        # Moves playback to tick (clamped to the replay); returns the state,
+        # which is a new object when a snapshot was restored
+        tick = max(0, min(tick, len(self.codes)))
+        base = max(t for t in self.snapshots if t <= tick)
+        if tick < self.state.tick or base > self.state.tick:
+            self.state = snapshot(self.snapshots[base])
+        while self.state.tick < tick and not self.done:
+            self.step()
+        return self.state
+
+    def run(self):
+        while not self.done:
+            self.step()
+        return self.state
+
+def verify(job):
+    # Replays one file headless on a level file (None: the classic maze);
+    # returns (path, ticks, matched outcome or None if none recorded)
+    path, level_path = job
+    replay = load(path)
+    state = Player(replay, load_level(level_path) if level_path else CLASSIC).run()
+    if replay.outcome is None:
+        return path, state.tick, None
+    outcome = (state.tick, state.score, state.lives, state.won, state_hash(state))
+    return path, state.tick, outcome == tuple(replay.outcome)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-run recorded games headless and check their outcomes")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--level", metavar="FILE", help="level file the replays were recorded on")
+    args = parser.parse_args(argv)
+    jobs = [(path, args.level) for path in args.files]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(verify, jobs, chunksize=max(1, len(jobs) // (args.workers * 4))))
+    elapsed = time.perf_counter() - start
+    diverged = [path for path, ticks, ok in results if ok is False]
+    for path in diverged:
+        print(f"DIVERGED {path}")
+    print(f"{len(results)} replays, {sum(ticks for path, ticks, ok in results)} ticks in {elapsed:.1f}s; "
+          f"{len(diverged)} diverged, {sum(ok is None for path, ticks, ok in results)} without an outcome")
+    return 1 if diverged else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
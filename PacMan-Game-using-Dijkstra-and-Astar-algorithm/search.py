@@ -0,0 +1,134 @@
+import heapq
+from grid import as_grid
+
+# The tile-grid search behind ghost steering (dijkstra.py, astar.py),
+# get_path and the searches built on it. It keeps the exact expansion order
+# of the per-caller copies it replaced, so games, replays and tournament
+# results are unchanged; what goes is the per-call allocation:
+#
+# - dist and prev live in a Workspace per grid shape, reused by every
+#   search, the Auto-Pilot's BFS (autopilot.bfs_path) and the debug
+#   overlay's bidirectional search included. A search writes distances as
+#   stamp + steps, with a stamp below anything an earlier search wrote, so
+#   old entries read as unvisited (further than any distance of this
+#   search) and nothing is ever cleared.
+# - Heap entries are single ints instead of tuples. Dijkstra packs
+#   (cost, x, y) as cost * size + x * rows + y and A* packs (f, cost, x, y)
+#   as (f * size + cost) * size + x * rows + y, which sort the same way.
+
+FRESH = (1 << 30) - 1  # Stamps stay below this, so distances remain one-digit ints for CPython
+
+class Workspace:
+    # Search buffers for one grid shape, shared by all searches on grids of
+    # that shape. Searches never nest, so one set is enough per slot.
+    def __init__(self, size):
+        self.size = size
+        self.dist = [FRESH] * size
+        self.prev = [-1] * size
+        self.stamp = FRESH
+
+    def begin(self):
+        # Returns the stamp for a new search; this search's distances are
+        # the entries below stamp + size + 1
+        self.stamp -= self.size + 1
+        if self.stamp < 0:
+            self.dist = [FRESH] * self.size  # Stamps ran out: start over
+            self.stamp = FRESH - self.size - 1
+        return self.stamp
+
+    def reached(self, i):
+        return self.dist[i] <= self.stamp + self.size
+
+_workspaces = {}  # (rows, cols, slot) -> Workspace
+
+def workspace(grid, slot=0):
+    # Buffers for searching grid; searches that need two sets at once (the
+    # two sides of a bidirectional search) use a second slot
+    key = (grid.rows, grid.cols, slot)
+    ws = _workspaces.get(key)
+    if ws is None:
+        ws = _workspaces[key] = Workspace(grid.size)
+    return ws
+
+def _search(grid, s, g, astar, stats):
+    # Dijkstra, or A* with a Manhattan distance heuristic, from tile s until
+    # tile g is expanded. Returns the workspace, whose prev entries lead back
+    # from g to s, or None when g can't be reached.
+    ws = workspace(grid)
+    stamp = ws.begin()
+    rows, cols, size = grid.rows, grid.cols, grid.size
+    dist, prev, neighbours = ws.dist, ws.prev, grid.neighbours
+    heappush, heappop = heapq.heappush, heapq.heappop
+    dist[s] = stamp
+    sx, sy = s % cols, s // cols
+    gx, gy = g % cols, g // cols
+    expanded, pushes = 0, 1  # The start tile is the first push
+    if astar:
+        heap = [(abs(sx - gx) + abs(sy - gy)) * size * size + sx * rows + sy]
+        while heap:
+            key = heappop(heap)
+            expanded += 1
+            t = key % size
+            i = t % rows * cols + t // rows
+            if i == g:
+                break
+            new_cost = key // size % size + 1
+            new_dist = stamp + new_cost
+            for n in neighbours[i]:
+                if new_dist < dist[n]:
+                    dist[n] = new_dist
+                    prev[n] = i
+                    pushes += 1
+                    nx, ny = n % cols, n // cols
+                    heappush(heap, ((new_cost + abs(nx - gx) + abs(ny - gy)) * size + new_cost) * size + nx * rows + ny)
+    else:
+        heap = [sx * rows + sy]
+        while heap:
+            key = heappop(heap)
+            expanded += 1
+            t = key % size
+            i = t % rows * cols + t // rows
+            if i == g:
+                break
+            new_cost = key // size + 1
+            new_dist = stamp + new_cost
+            key = new_cost * size
+            for n in neighbours[i]:
+                if new_dist < dist[n]:
+                    dist[n] = new_dist
+                    prev[n] = i
+                    pushes += 1
+                    heappush(heap, key + n % cols * rows + n // cols)
+    if stats is not None:
+        stats["expanded"] += expanded
+        stats["pushes"] += pushes
+    return ws if ws.reached(g) else None
+
+def shortest_path(start, goal, maze, algorithm="dijkstra", stats=None):
+    # List of (x, y) positions from start to goal (including both), or []
+    # if there is no path
+    grid = as_grid(maze)
+    s, g = grid.index(*start), grid.index(*goal)
+    ws = _search(grid, s, g, algorithm == "astar", stats)
+    if ws is None:
+        return []
+    prev, path, i = ws.prev, [], g
+    while i != s:
+        path.append(grid.xy(i))
+        i = prev[i]
+    path.append(start)
+    path.reverse()
+    return path
+
+def next_step(start, goal, maze, algorithm="dijkstra", stats=None):
+    # The (x, y) after start on a shortest path to goal, or None when there
+    # is no path or start is the goal
+    grid = as_grid(maze)
+    s, g = grid.index(*start), grid.index(*goal)
+    ws = _search(grid, s, g, algorithm == "astar", stats)
+    if ws is None or s == g:
+        return None
+    prev, i = ws.prev, g
+    while prev[i] != s:
+        i = prev[i]
+    return grid.xy(i)
@@ -0,0 +1,330 @@
+import argparse
+import asyncio
+import os
+import random
+import struct
+import sys
+import time
+from collections import deque
+from astar import PATHFINDING_ALGORITHM
+from distance_field import DistanceField
+from game import ALGORITHMS, CLASSIC, FPS, GameState, get_path
+from level import load as load_level
+from next_hop import load_or_build
+from replay import ACTIONS, TOGGLE_AUTO_PILOT, Recorder, action_code, apply_input, valid_code
+from timestep import FixedTimestep
+from tournament import DIRECTIONS, OPENING_TICKS, TURN_CHANCE
+
+# Headless game server: many games in one process, each a GameState stepped
+# by a single asyncio event loop at the tick rate. Clients connect over TCP
+# or a Unix socket and send input codes (one byte each, see replay.py),
+# which their game takes one per tick as main.py does (a byte that isn't
+# one ends the client's game); back comes a frame per tick with what
+# changed. All games play one level and share its neighbour lists (and
+# next-hop table, if any). Each tick steps every game in one pass through a
+# SearchBatch, which runs a ghost search that several games ask for only
+# once. Games play exactly as they would alone, so
+# --record saves replays that replay.py checks like any other.
+#
+# Usage: python server.py [--port 7654 | --unix PATH] [--bots N] [--record DIR]
+#
+# Server messages are a u32 length, then the message (little endian):
+#   hello   "PMSV", version u8, session u32, level digest 8s, rows u16,
+#           cols u16, tick_rate u16, then rows * cols tile bytes
+#   frame   tick u32, score i32, lives u8, status u8, entity count u8,
+#           tile count u32, then for each entity that moved or changed
+#           state: index u8 (0 = Pac-Man, then the ghosts), x u16, y u16,
+#           state u8; then for each tile that changed: index u32, tile u8
+# An entity's state holds its direction as an ACTIONS index in the low 3
+# bits (0 = standing still), plus FRIGHTENED and RESPAWNING. The first frame
+# lists every entity. The connection closes after the game's last frame,
+# which has RUNNING clear unless the game was cut short (--max-ticks, the
+# server stopping).
+
+MAGIC = b"PMSV"
+VERSION = 1
+PORT = 7654
+LENGTH = struct.Struct("<I")
+HELLO = struct.Struct("<4sBI8sHHH")
+FRAME = struct.Struct("<IiBBBI")
+ENTITY = struct.Struct("<BHHB")
+TILE = struct.Struct("<IB")
+RUNNING, WON, LOST_LIFE, AUTO_PILOT = 1, 2, 4, 8  # Frame status bits
+FRIGHTENED, RESPAWNING = 8, 16  # Entity state bits
+MAX_INPUTS = 16  # Input codes queued per game; the oldest go beyond this
+MAX_BUFFERED = 1 << 16  # Bytes a client may fall behind by before it is dropped
+STATUS_SECONDS = 10  # Seconds between status lines
+
+class SearchBatch:
+    # The ghost searches of one tick, across all games. Games on the same
+    # level whose doors are in the same state share neighbour lists
+    # (Grid.share_neighbours), so a search is known by those lists, its ends
+    # and the algorithm: the first game to ask runs it and later ones get
+    # the same result, which none of them modify. Results only hold for the
+    # tick, so they are dropped when the next one begins.
+    def __init__(self):
+        self.layouts = {}  # Neighbour lists per door state, for Grid.share_neighbours
+        self.results = {}
+        self.searches = 0  # Searches run
+        self.shared = 0  # Searches answered with another game's result
+
+    def begin_tick(self):
+        self.results.clear()
+
+    def _result(self, key, search, *args):
+        result = self.results.get(key)
+        if result is None:
+            result = self.results[key] = search(*args)
+            self.searches += 1
+        else:
+            self.shared += 1
+        return result
+
+    def get_path(self, start, goal, maze, algorithm, table=None, stats=None):
+        # game.get_path, for GameState.plan_path (and so the path cache)
+        key = ("path", id(maze.share_neighbours(self.layouts)), start, goal, algorithm, id(table))
+        return self._result(key, get_path, start, goal, maze, algorithm, table, stats)
+
+    def distance_field(self, maze, target, stats=None):
+        # DistanceField, for games with distance_field on
+        key = ("field", id(maze.share_neighbours(self.layouts)), target)
+        return self._result(key, DistanceField, maze, target, stats)
+
+class Bot:
+    # Plays like an Auto-Pilot game of tournament.py: a seeded random opening,
+    # then Auto-Pilot, so bots with different seeds play different games
+    def __init__(self, seed):
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+    def code(self, state):
+        if state.tick >= OPENING_TICKS:
+            return 0 if state.auto_pilot else TOGGLE_AUTO_PILOT
+        if self.rng.random() < TURN_CHANCE:
+            return action_code(self.rng.choice(DIRECTIONS))
+        return 0
+
+def entity_state(entity):
+    direction = ACTIONS.index(entity.dir) if entity.dir != (0, 0) else 0
+    return direction | (FRIGHTENED if entity.frightened else 0) | (RESPAWNING if entity.respawn_timer > 0 else 0)
+
+def encode_hello(session, state):
+    grid = state.maze
+    return HELLO.pack(MAGIC, VERSION, session, state.level.digest(), grid.rows, grid.cols, state.tick_rate) + bytes(grid.cells)
+
+def encode_frame(state, sent):
+    # The frame for the tick state just ran. sent holds, per entity, the
+    # (x, y, state) the client last got, and is brought up to date.
+    entities = bytearray()
+    count = 0
+    for i, entity in enumerate([state.pacman] + state.ghosts):
+        now = (entity.x, entity.y, entity_state(entity))
+        if sent[i] != now:
+            sent[i] = now
+            entities += ENTITY.pack(i, *now)
+            count += 1
+    grid = state.maze
+    tiles = b"".join(TILE.pack(grid.index(x, y), grid.get(x, y)) for x, y in state.changed_tiles)
+    status = ((RUNNING if state.running else 0) | (WON if state.won else 0) |
+              (LOST_LIFE if state.lost_life else 0) | (AUTO_PILOT if state.auto_pilot else 0))
+    return FRAME.pack(state.tick, state.score, state.lives, status, count, len(state.changed_tiles)) + entities + tiles
+
+def decode_hello(data):
+    # (session, level digest, rows, cols, tick_rate, tiles) from a hello
+    magic, version, session, digest, rows, cols, tick_rate = HELLO.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a game server (or an unsupported version)")
+    return session, digest, rows, cols, tick_rate, data[HELLO.size:HELLO.size + rows * cols]
+
+def decode_frame(data):
+    # (tick, score, lives, status, [(index, x, y, state)], [(tile index, tile)])
+    tick, score, lives, status, count, changed = FRAME.unpack_from(data)
+    pos = FRAME.size
+    entities = [ENTITY.unpack_from(data, pos + k * ENTITY.size) for k in range(count)]
+    pos += count * ENTITY.size
+    tiles = [TILE.unpack_from(data, pos + k * TILE.size) for k in range(changed)]
+    return tick, score, lives, status, entities, tiles
+
+async def read_message(reader):
+    # The next server message, or None once the server has closed
+    try:
+        length, = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+        return await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        return None
+
+class Session:
+    # One hosted game, played by a client over its connection or by a Bot
+    def __init__(self, number, state, writer=None, bot=None, recorder=None):
+        self.number = number
+        self.state = state
+        self.writer = writer
+        self.bot = bot
+        self.recorder = recorder
+        self.inputs = deque(maxlen=MAX_INPUTS)  # Input codes from the client, one taken per tick
+        self.sent = [None] * (1 + len(state.ghosts))  # See encode_frame
+        self.closed = False
+
+    def send(self, message):
+        self.writer.write(LENGTH.pack(len(message)) + message)
+
+    def step(self):
+        state = self.state
+        if self.bot is not None:
+            code = self.bot.code(state)
+        else:
+            code = self.inputs.popleft() if self.inputs else 0
+        state.changed_tiles.clear()
+        if self.recorder is not None:
+            self.recorder.step(state, code)
+        else:
+            apply_input(state, code)
+        if self.writer is not None:
+            self.send(encode_frame(state, self.sent))
+
+class Server:
+    def __init__(self, level, settings, table=None, bots=0, seed=0, max_ticks=0, record_dir=None):
+        self.level = level
+        self.settings = settings  # GameState keyword arguments for every game
+        self.table = table  # Optional NextHopTable shared by every game
+        self.search_batch = SearchBatch()
+        self.sessions = []
+        self.bots = bots  # Bot games kept running; a finished one is replaced
+        self.seed = seed  # Seed of the next bot
+        self.max_ticks = max_ticks  # Tick limit per game, 0 for none
+        self.record_dir = record_dir
+        self.games = 0  # Games started
+        self.ticks = 0  # Server ticks run
+        self.seconds = 0.0  # Time spent in them
+
+    def start(self, writer=None, bot=None):
+        state = GameState(self.level, table=self.table, **self.settings)
+        state.search_batch = self.search_batch
+        state.changed_tiles = []
+        recorder = Recorder(state, seed=bot.seed if bot else 0) if self.record_dir else None
+        self.games += 1
+        session = Session(self.games, state, writer, bot, recorder)
+        if writer is not None:
+            session.send(encode_hello(session.number, state))
+        self.sessions.append(session)
+        return session
+
+    def finish(self, session):
+        if session.closed:
+            return
+        session.closed = True
+        if session.recorder is not None:
+            session.recorder.save(os.path.join(self.record_dir, f"game-{session.number}.pmr"), session.state)
+        if session.writer is not None:
+            session.writer.close()
+
+    async def handle(self, reader, writer):
+        # One client: its game runs until it ends, the client disconnects or
+        # sends a byte that isn't an input code
+        session = self.start(writer)
+        try:
+            while not session.closed:
+                data = await reader.read(4096)
+                if not data or not all(valid_code(code) for code in data):
+                    break
+                session.inputs.extend(data)
+        except ConnectionError:
+            pass
+        finally:
+            self.finish(session)
+
+    def tick(self):
+        start = time.perf_counter()
+        self.search_batch.begin_tick()
+        for session in self.sessions:
+            if session.closed:
+                continue
+            session.step()
+            state = session.state
+            if not state.running or state.tick == self.max_ticks:
+                self.finish(session)
+            elif session.writer is not None and session.writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+                self.finish(session)  # The client can't keep up
+        self.sessions = [session for session in self.sessions if not session.closed]
+        while sum(session.bot is not None for session in self.sessions) < self.bots:
+            self.start(bot=Bot(self.seed))
+            self.seed += 1
+        self.ticks += 1
+        self.seconds += time.perf_counter() - start
+
+    def status(self, timestep, elapsed):
+        batch = self.search_batch
+        return (f"{len(self.sessions)} games ({self.games} started), {self.ticks} ticks in {elapsed:.1f}s, "
+                f"{self.seconds * 1000 / max(1, self.ticks):.2f} ms per tick, {timestep.dropped} dropped; "
+                f"{batch.searches} searches run, {batch.shared} shared")
+
+    async def run(self, tick_rate, duration=0):
+        # Ticks at tick_rate for duration seconds (0: until cancelled). A tick
+        # that overruns delays the next ones; past FixedTimestep's catch-up
+        # limit ticks are dropped, and the games slow down instead.
+        loop = asyncio.get_running_loop()
+        timestep = FixedTimestep(tick_rate)
+        begin = last = report = loop.time()
+        try:
+            while not duration or last - begin < duration:
+                await asyncio.sleep((1 - timestep.pending) / tick_rate)
+                now = loop.time()
+                for _ in range(timestep.advance(now - last)):
+                    self.tick()
+                last = now
+                if now - report >= STATUS_SECONDS:
+                    print(self.status(timestep, now - begin))
+                    report = now
+        finally:
+            for session in self.sessions:
+                self.finish(session)
+            print(self.status(timestep, loop.time() - begin))
+
+async def serve(server, args):
+    if args.unix:
+        listener = await asyncio.start_unix_server(server.handle, path=args.unix)
+        where = args.unix
+    else:
+        listener = await asyncio.start_server(server.handle, args.host, args.port)
+        where = f"{args.host}:{args.port}"
+    print(f"Serving {server.level.name} on {where} at {args.tick_rate} ticks per second")
+    async with listener:
+        await server.run(args.tick_rate, args.duration)
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Host many headless Pac-Man games for socket clients")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--level", metavar="FILE", help="play a level file instead of the classic maze")
+    parser.add_argument("--algorithm", choices=ALGORITHMS, default=PATHFINDING_ALGORITHM)
+    parser.add_argument("--tick-rate", type=int, default=FPS)
+    parser.add_argument("--distance-field", action="store_true", help="ghosts share one BFS field from Pac-Man")
+    parser.add_argument("--danger-field", action="store_true", help="Auto-Pilot avoids ghosts and chases frightened ones")
+    parser.add_argument("--next-hop", action="store_true", help="share a precomputed next-hop table (levels without doors)")
+    parser.add_argument("--bots", type=int, default=0, help="Auto-Pilot games to keep running without a client")
+    parser.add_argument("--seed", type=int, default=0, help="first bot seed; each new bot takes the next")
+    parser.add_argument("--max-ticks", type=int, default=0, help="tick limit per game (0: none)")
+    parser.add_argument("--duration", type=float, default=0, help="seconds to run for (0: until interrupted)")
+    parser.add_argument("--record", metavar="DIR", help="save a replay of every game in DIR (see replay.py)")
+    args = parser.parse_args(argv)
+    if args.record and args.next_hop:
+        parser.error("--record can't be used with --next-hop; replays don't store the table")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    level = load_level(args.level) if args.level else CLASSIC
+    settings = {"algorithm": args.algorithm, "tick_rate": args.tick_rate,
+                "distance_field": args.distance_field, "danger_field": args.danger_field}
+    table = load_or_build(level.grid) if args.next_hop else None
+    if args.record:
+        os.makedirs(args.record, exist_ok=True)
+    server = Server(level, settings, table, args.bots, args.seed, args.max_ticks, args.record)
+    try:
+        asyncio.run(serve(server, args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,37 @@
+MAX_CATCH_UP = 8  # Most ticks simulated for one rendered frame before time is dropped
+
+class FixedTimestep:
+    # Decouples the simulation rate from the frame rate. Each frame hands in
+    # the real time it took; advance() returns how many whole ticks that time
+    # pays for and carries the remainder over to the next frame, so the game
+    # runs at tick_rate ticks per second whatever the display does. A fast
+    # display gets frames with no tick at all, drawn with positions
+    # interpolated by alpha (the fraction of the next tick already elapsed).
+    # A slow frame runs several ticks to catch up, but at most max_ticks:
+    # beyond that the time is dropped, so a long stall (a dragged window, a
+    # breakpoint) slows the game down instead of fast-forwarding through it.
+    # The simulation itself only ever sees whole ticks, so its outcome does
+    # not depend on how frames happened to be timed.
+    def __init__(self, tick_rate, max_ticks=MAX_CATCH_UP):
+        self.tick_rate = tick_rate
+        self.max_ticks = max_ticks
+        self.pending = 0.0  # Ticks owed, counted in ticks rather than seconds
+        self.alpha = 0.0
+        self.ticks = 0  # Ticks handed out so far
+        self.dropped = 0  # Ticks skipped because frames were too slow
+
+    def reset(self):
+        # Forgets time owed, e.g. after a pause or a deliberate wait
+        self.pending = 0.0
+        self.alpha = 0.0
+
+    def advance(self, seconds):
+        self.pending += seconds * self.tick_rate
+        ticks = int(self.pending)
+        self.pending -= ticks
+        if ticks > self.max_ticks:
+            self.dropped += ticks - self.max_ticks
+            ticks = self.max_ticks
+        self.ticks += ticks
+        self.alpha = self.pending
+        return ticks
@@ -0,0 +1,139 @@
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from game import ALGORITHMS, CLASSIC, FPS, GameState
+from level import load as load_level
+from replay import TOGGLE_AUTO_PILOT, Recorder, action_code
+
+# Plays many seeded headless games for every ghost algorithm and Auto-Pilot
+# setting across all cores, and reports how each combination did and what
+# its pathfinding cost. Usage: python tournament.py --games 200 --csv out.csv
+
+DIRECTIONS = [(1,0), (-1,0), (0,1), (0,-1)]
+OPENING_TICKS = FPS * 2  # Random opening before Auto-Pilot takes over
+TURN_CHANCE = 0.05  # Per tick chance that the random player picks a new direction
+
+_levels = {}  # Level files already loaded by this worker
+
+def _level(path):
+    if path is None:
+        return CLASSIC
+    if path not in _levels:
+        _levels[path] = load_level(path)
+    return _levels[path]
+
+def play(job):
+    # One headless game. The seed drives a random player: for the whole game
+    # when Auto-Pilot is off, and for a short opening before it takes over
+    # when it is on, so seeded Auto-Pilot games don't all play out the same.
+    algorithm, auto_pilot, seed, max_ticks, record_dir, level_path, danger_field = job
+    rng = random.Random(seed)
+    state = GameState(_level(level_path), algorithm=algorithm, record_stats=True, danger_field=danger_field)
+    recorder = Recorder(state, seed=seed)
+    while state.running and state.tick < max_ticks:
+        code = 0
+        if auto_pilot and state.tick >= OPENING_TICKS:
+            if not state.auto_pilot:
+                code = TOGGLE_AUTO_PILOT
+        elif rng.random() < TURN_CHANCE:
+            code = action_code(rng.choice(DIRECTIONS))
+        recorder.step(state, code)
+    if record_dir:
+        recorder.save(os.path.join(record_dir, f"{algorithm}-{'auto' if auto_pilot else 'manual'}-{seed}.pmr"), state)
+    stats, cache = state.search_stats, state.path_cache
+    return {
+        "algorithm": algorithm,
+        "auto_pilot": auto_pilot,
+        "seed": seed,
+        "won": state.won,
+        "score": state.score,
+        "ticks": state.tick,
+        "lives": state.lives,
+        "search_calls": stats["calls"],
+        "search_ms": stats["seconds"] * 1000,
+        "nodes_expanded": stats["expanded"],
+        "heap_pushes": stats["pushes"],
+        "path_cache_hits": cache.hits,
+        "path_cache_misses": cache.misses,
+    }
+
+def summarize(games):
+    # One row per (algorithm, Auto-Pilot) pair, averaged over its games
+    groups = {}
+    for game in games:
+        groups.setdefault((game["algorithm"], game["auto_pilot"]), []).append(game)
+    rows = []
+    for (algorithm, auto_pilot), group in sorted(groups.items()):
+        n = len(group)
+        calls = sum(g["search_calls"] for g in group)
+        lookups = sum(g["path_cache_hits"] + g["path_cache_misses"] for g in group)
+        rows.append({
+            "algorithm": algorithm,
+            "auto_pilot": auto_pilot,
+            "games": n,
+            "win_rate": sum(g["won"] for g in group) / n,
+            "mean_score": sum(g["score"] for g in group) / n,
+            "mean_ticks": sum(g["ticks"] for g in group) / n,
+            "search_ms_per_game": sum(g["search_ms"] for g in group) / n,
+            "nodes_expanded_per_game": sum(g["nodes_expanded"] for g in group) / n,
+            "heap_pushes_per_game": sum(g["heap_pushes"] for g in group) / n,
+            "us_per_search": sum(g["search_ms"] for g in group) * 1000 / calls if calls else 0.0,
+            "path_cache_hit_rate": sum(g["path_cache_hits"] for g in group) / lookups if lookups else 0.0,
+        })
+    return rows
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Dijkstra vs A* vs JPS headless tournament")
+    parser.add_argument("--games", type=int, default=100, help="games per algorithm/Auto-Pilot pair")
+    parser.add_argument("--seed", type=int, default=0, help="first seed; game i uses seed + i")
+    parser.add_argument("--algorithms", nargs="+", default=ALGORITHMS, choices=ALGORITHMS)
+    parser.add_argument("--auto-pilot", choices=["on", "off", "both"], default="both")
+    parser.add_argument("--max-ticks", type=int, default=FPS * 60 * 5, help="tick limit per game")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--csv", help="write the summary table as CSV")
+    parser.add_argument("--json", help="write the summary and every game as JSON")
+    parser.add_argument("--record", metavar="DIR", help="save a replay of every game in DIR (see replay.py)")
+    parser.add_argument("--level", metavar="FILE", help="play a level file instead of the classic maze")
+    parser.add_argument("--danger-field", action="store_true", help="Auto-Pilot avoids ghosts and chases frightened ones")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    settings = {"on": [True], "off": [False], "both": [False, True]}[args.auto_pilot]
+    # Every pair plays the same seeds so the comparison is paired
+    jobs = [
+        (algorithm, auto_pilot, args.seed + i, args.max_ticks, args.record, args.level, args.danger_field)
+        for algorithm in args.algorithms
+        for auto_pilot in settings
+        for i in range(args.games)
+    ]
+    if args.record:
+        os.makedirs(args.record, exist_ok=True)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        games = list(pool.map(play, jobs, chunksize=max(1, len(jobs) // (args.workers * 4))))
+    elapsed = time.perf_counter() - start
+    summary = summarize(games)
+
+    columns = list(summary[0].keys())
+    print(f"{len(games)} games, {sum(g['ticks'] for g in games)} ticks in {elapsed:.1f}s")
+    print("  ".join(columns))
+    for row in summary:
+        print("  ".join(f"{v:.3f}" if isinstance(v, float) else str(v) for v in row.values()))
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(summary)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"summary": summary, "games": games}, f, indent=2)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])